@@ -1,9 +1,24 @@
+import copy
+import json
+import mmap
+import os
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
 from prettytable import PrettyTable
 
 class Automata:
 
-    def __init__(self, pattern,sequence):
+    def __init__(self, pattern, sequence="", cache=True):
+        """
+        Compila o autómato para o padrão. A sequência é opcional: as posições
+        (matches) e a tabela (table) só são calculadas quando são pedidas, e
+        o autómato pode ser aplicado a qualquer outra sequência com iter_matches.
+        Com cache=True as tabelas compiladas são procuradas (e guardadas) em
+        automata_cache e partilhadas entre instâncias com o mesmo padrão.
 
+        """
         if not pattern or len(pattern) < 2:
             raise ValueError("O padrão deve conter pelo menos dois caracteres.")
         
@@ -11,10 +26,39 @@ class Automata:
         self.sequence = sequence
         self.alphabet = sorted(set(pattern))
         self.m = len(pattern)
-        self.states = list(range(self.m + 1))
-        self.transition_table = self.build_transition_table()
-        self.matches = self.find_matches()
-        self.table = self.print_table()
+        key = (type(self).__name__, pattern, tuple(self.alphabet))
+        compiled = automata_cache.get(key) if cache else None
+        if compiled is None:
+            self.states = list(range(self.m + 1))
+            self.final_states = {self.m} #Estados em que acaba uma ocorrência do padrão.
+            self.transition_table = self.build_transition_table()
+            self.build_dense_table()
+            if cache:
+                automata_cache.put(key, self)
+        else:
+            self.__dict__.update(compiled)
+        self._matches = None #Calculados apenas no primeiro acesso a self.matches.
+        self._table = None #Calculada apenas no primeiro acesso a self.table.
+
+    @property
+    def matches(self):
+        """
+        Posições onde o padrão ocorre em self.sequence (calculadas no primeiro acesso)
+
+        """
+        if self._matches is None:
+            self._matches = self.find_matches()
+        return self._matches
+
+    @property
+    def table(self):
+        """
+        Tabela PrettyTable da execução sobre self.sequence (construída no primeiro acesso)
+
+        """
+        if self._table is None:
+            self._table = self.print_table()
+        return self._table
 
     def max_overlap(self, s1, s2):
         """
@@ -30,45 +74,262 @@ class Automata:
 
     def build_transition_table(self):
         """
-        Constrói a table de transições
+        Constrói a table de transições em O(m·|Σ|) usando a função de falha (KMP)
 
         """
         table = {} #Inicializa o dicionário
-        for q in self.states: #Itera sobre todos os estados possíveis do autómato.
-            for a in self.alphabet: #Para cada símbolo no alfabeto, calcula a próxima transição.
-                prefix = self.pattern[:q] + a #Pega nos elementos do padrão até o estado q e adiciona o elemento a.
-                next_state = self.max_overlap(prefix, self.pattern) #Calcula o próximo estado com base na maior sobreposição entre o prefixo e o padrão.
-                table[(q, a)] = next_state # Registra a transição na table.
+        for a in self.alphabet: #A partir do estado 0 só se avança com o primeiro símbolo do padrão.
+            table[(0, a)] = 1 if a == self.pattern[0] else 0
+        fallback = 0 #Estado em que o autómato estaria ao ler o padrão sem o primeiro símbolo (função de falha).
+        for q in range(1, self.m + 1): #Itera sobre os restantes estados.
+            for a in self.alphabet:
+                if q < self.m and a == self.pattern[q]:
+                    table[(q, a)] = q + 1 #O símbolo continua o padrão.
+                else:
+                    table[(q, a)] = table[(fallback, a)] #Caso contrário, comporta-se como o estado de falha.
+            if q < self.m:
+                fallback = table[(fallback, self.pattern[q])] #Atualiza o estado de falha para o prefixo seguinte.
         return table #retorna a table completa das transições.
 
-    def process_sequence(self):
+    def build_dense_table(self):
         """
-        Aplica o AF a uma sequência e retorna a lista de estados
+        Versão compacta da tabela de transições: cada símbolo do alfabeto recebe um
+        código inteiro (os símbolos fora do alfabeto recebem o código len(alphabet))
+        e as transições ficam num array plano indexado por estado*stride + código.
+        Os valores guardados já vêm multiplicados por stride, para que o ciclo de
+        procura só precise de uma soma e de um acesso ao array por símbolo.
 
         """
+        self.symbol_codes = {a: i for i, a in enumerate(self.alphabet)}
+        other = len(self.alphabet) #Código comum a todos os símbolos fora do alfabeto.
+        self.stride = other + 1
+        self.dense_table = array('l', [0]) * (len(self.states) * self.stride)
+        for (q, a), next_state in self.transition_table.items():
+            self.dense_table[q * self.stride + self.symbol_codes[a]] = next_state * self.stride
+        self.final_offsets = frozenset(q * self.stride for q in self.final_states)
+
+        self.byte_codes = None #Tabela de tradução byte -> código (só se o alfabeto couber em latin-1).
+        if all(ord(a) < 256 for a in self.alphabet):
+            codes = bytearray([other]) * 256
+            for a, code in self.symbol_codes.items():
+                codes[ord(a)] = code
+            self.byte_codes = bytes(codes)
+
+    def encode(self, sequence):
+        """
+        Converte uma sequência (str ou bytes) num buffer de bytes com os códigos dos símbolos
+
+        """
+        if self.byte_codes is not None:
+            data = sequence
+            if isinstance(sequence, str):
+                try:
+                    data = sequence.encode("latin-1")
+                except UnicodeEncodeError: #Há símbolos fora de latin-1, que nunca estão no alfabeto.
+                    data = None
+            if data is not None:
+                return bytes(data).translate(self.byte_codes)
+        other = len(self.alphabet)
+        return bytes(self.symbol_codes.get(s, other) for s in sequence)
+
+    def _scan(self, codes, start=0):
+        """
+        Percorre um iterável de códigos com a tabela densa e devolve as posições iniciais
+        das ocorrências (somadas a start)
+
+        """
+        table = self.dense_table
+        finals = self.final_offsets
+        shift = start - self.m + 1
+        offset = 0
+        for i, code in enumerate(codes):
+            offset = table[offset + code]
+            if offset in finals:
+                yield i + shift
+
+    def process_sequence(self, sequence=None):
+        """
+        Aplica o AF a uma sequência (por omissão self.sequence) e retorna a lista de estados
+
+        """
+        if sequence is None:
+            sequence = self.sequence
         current_state = 0 #Define o estado inicial, 0.
         state_list = [current_state] # Inicializa a lista já com o estado inicial, 0.
-        for symbol in self.sequence: #Itera sobre cada símbolo da sequência de entrada.
+        for symbol in sequence: #Itera sobre cada símbolo da sequência de entrada.
             current_state = self.transition_table.get((current_state, symbol), 0) #Verifica na table de transições para saber qual estado ir a partir da posição e simbolo atual. Se o sibolo não estiver no alfabeto volta para o estado 0.
             state_list.append(current_state) #Adiciona o novo estado à lista de estados.
         return state_list #Retorna a lista completa de estados
 
-    def find_matches(self):
+    def iter_matches(self, sequence=None):
+        """
+        Gerador que devolve as posições do padrão à medida que a sequência é lida,
+        sem guardar a lista de estados
+
+        """
+        if sequence is None:
+            sequence = self.sequence
+        if isinstance(sequence, (str, bytes, bytearray, memoryview)):
+            codes = self.encode(sequence) #A sequência inteira é codificada de uma vez.
+        else: #Iterador genérico: codifica símbolo a símbolo.
+            other = len(self.alphabet)
+            codes = (self.symbol_codes.get(symbol, other) for symbol in sequence)
+        return self._scan(codes)
+
+    def find_matches(self, sequence=None):
         """
         Retorna a lista de posições onde o padrão foi encontrado na sequência
 
         """
-        states = self.process_sequence( ) #Executa o autómato sobre a sequência, obtendo a lista de estados.
-        match_positions = [] #Inicializa a lista de matches.
-        for i, state in enumerate(states): #Percorre a lista de estados com os respectivos índices.
-            if state == self.m:
-                match_positions.append(i - self.m) #Calcula a posição inicial da ocorrência do padrão.
-        return match_positions #Retorna a lista de posições onde o padrão ocorre na sequência.
+        return list(self.iter_matches(sequence)) #Retorna a lista de posições onde o padrão ocorre na sequência.
+
+    def find_matches_parallel(self, sequence=None, processes=None, chunk_size=1 << 20):
+        """
+        Procura o padrão numa sequência grande dividindo-a em blocos de chunk_size
+        símbolos (com m - 1 símbolos de sobreposição) processados num conjunto de
+        processos. Retorna a lista ordenada de posições, sem repetições.
+
+        """
+        if sequence is None:
+            sequence = self.sequence
+        tasks = ((None, start, chunk, limit) for start, chunk, limit in self._chunks(sequence, chunk_size))
+        positions = []
+        for _, part in self._run_parallel(tasks, processes):
+            positions.extend(part)
+        return positions
+
+    def find_matches_fasta(self, path, processes=None, chunk_size=1 << 20):
+        """
+        Procura o padrão em todos os registos de um ficheiro FASTA, em paralelo.
+        Retorna um dicionário {id do registo: lista de posições}.
+
+        """
+        def tasks():
+            for record_id, seq in read_fasta(path):
+                results.setdefault(record_id, [])
+                for start, chunk, limit in self._chunks(seq, chunk_size):
+                    yield record_id, start, chunk, limit
+
+        results = {}
+        for record_id, part in self._run_parallel(tasks(), processes):
+            results[record_id].extend(part)
+        return results
+
+    def iter_file_matches(self, path, block_size=1 << 20):
+        """
+        Gerador de pares (id do registo, posição) para um ficheiro de texto simples ou
+        FASTA. O ficheiro é mapeado em memória (mmap) e lido por blocos de no máximo
+        block_size bytes, que são traduzidos para códigos sem passar por str; as linhas
+        de cabeçalho e as mudanças de linha são ignoradas. O id é a primeira palavra do
+        cabeçalho ("" para sequências sem cabeçalho) e as posições contam-se dentro de
+        cada registo.
+
+        """
+        for record_id, position in self._scan_file(path, block_size):
+            if position is not None:
+                yield record_id, position
+
+    def find_matches_file(self, path, block_size=1 << 20):
+        """
+        Procura o padrão num ficheiro mapeado em memória. Retorna {id do registo: posições}.
+
+        """
+        results = {}
+        for record_id, position in self._scan_file(path, block_size):
+            positions = results.setdefault(record_id, [])
+            if position is not None:
+                positions.append(position)
+        return results
+
+    def _scan_file(self, path, block_size):
+        """
+        Aplica o AF diretamente aos bytes do ficheiro. Devolve (id, None) no início de
+        cada registo e (id, posição) para cada ocorrência.
+
+        """
+        if block_size < 1:
+            raise ValueError("block_size tem de ser positivo.")
+        if self.byte_codes is None:
+            raise ValueError("O alfabeto do padrão tem símbolos que não cabem num byte.")
+        if os.path.getsize(path) == 0:
+            return
+
+        table = self.dense_table
+        finals = self.final_offsets
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            n = len(data)
+            record_id = ""
+            started = False
+            offset = 0 #Estado atual (já multiplicado por stride).
+            count = 0 #Número de símbolos lidos no registo atual.
+            pos = 0
+            line_start = True
+            while pos < n:
+                if line_start and data[pos] == ord(">"): #Cabeçalho: começa um novo registo.
+                    end = data.find(b"\n", pos)
+                    end = n if end < 0 else end
+                    header = data[pos + 1:end].decode("latin-1").split()
+                    record_id = header[0] if header else ""
+                    started = True
+                    yield record_id, None
+                    offset = count = 0
+                    pos = end + 1
+                    continue
+                stop = min(pos + block_size, n)
+                end = data.find(b"\n", pos, stop)
+                line_start = end >= 0
+                if not line_start:
+                    end = stop
+                codes = data[pos:end].translate(self.byte_codes, b" \t\r") #Só este bloco é copiado.
+                if codes and not started: #Ficheiro simples ou sequência antes do primeiro cabeçalho.
+                    started = True
+                    yield record_id, None
+                for i, code in enumerate(codes, count):
+                    offset = table[offset + code]
+                    if offset in finals:
+                        yield record_id, i - self.m + 1
+                count += len(codes)
+                pos = end + 1 if line_start else end
+
+    def _chunks(self, sequence, chunk_size):
+        """
+        Divide a sequência em blocos (start, bloco, limite) que se sobrepõem em m - 1
+        símbolos. Só contam as ocorrências que começam antes do limite, para que uma
+        ocorrência na zona de sobreposição não seja contada duas vezes.
+
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size tem de ser positivo.")
+        for start in range(0, len(sequence), chunk_size):
+            yield start, sequence[start:start + chunk_size + self.m - 1], start + chunk_size
+
+    def _run_parallel(self, tasks, processes):
+        """
+        Executa as tarefas num ProcessPoolExecutor, com um número limitado de blocos
+        em memória ao mesmo tempo, e devolve os resultados pela ordem das tarefas
+
+        """
+        processes = processes or os.cpu_count() or 1
+        compiled = copy.copy(self) #Os processos só precisam do autómato compilado, não da sequência.
+        compiled.sequence = ""
+        compiled._matches = None
+        compiled._table = None
+
+        pending = deque()
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(compiled,)) as executor:
+            for task in tasks:
+                pending.append((task[0], executor.submit(_scan_chunk, task[1:])))
+                if len(pending) >= 2 * processes:
+                    key, future = pending.popleft()
+                    yield key, future.result()
+            while pending:
+                key, future = pending.popleft()
+                yield key, future.result()
 
     def print_table(self): #Não precisas testar esta função, é só para imprimir a tabela de maneira melhor
 
         states = self.process_sequence()
-        occurrences = self.find_matches()
+        occurrences = {i - self.m for i, state in enumerate(states) if state in self.final_states} #As ocorrências saem da mesma lista de estados.
 
         table = PrettyTable()
         table.field_names = ["Index"] + list(range(len(self.sequence)))
@@ -89,6 +350,451 @@ class Automata:
 
         return table
 
+_worker_automaton = None #Autómato usado pelos processos de find_matches_parallel.
+
+
+def _init_worker(automaton):
+    """
+    Inicializador dos processos: guarda o autómato compilado numa variável global
+
+    """
+    global _worker_automaton
+    _worker_automaton = automaton
+
+
+def _scan_chunk(task):
+    """
+    Tarefa de um processo: ocorrências de um bloco que começam antes do limite
+
+    """
+    start, chunk, limit = task
+    return [pos for pos in _worker_automaton._scan(_worker_automaton.encode(chunk), start) if pos < limit]
+
+
+def read_fasta(path):
+    """
+    Gerador de pares (id, sequência) de um ficheiro FASTA, um registo de cada vez.
+    O id é a primeira palavra do cabeçalho.
+
+    """
+    record_id, lines = None, []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith(">"):
+                if record_id is not None:
+                    yield record_id, "".join(lines)
+                header = line[1:].split()
+                record_id, lines = (header[0] if header else ""), []
+            elif line:
+                if record_id is None: #Sequência sem cabeçalho.
+                    record_id = ""
+                lines.append(line)
+    if record_id is not None:
+        yield record_id, "".join(lines)
+
+
+class AutomataCache:
+    """
+    Cache LRU, partilhada por todo o processo, das tabelas compiladas dos autómatos.
+    A chave é (nome da classe, padrão, alfabeto) e o valor são os atributos de
+    COMPILED_FIELDS, que passam a ser partilhados (só de leitura) pelas instâncias.
+
+    """
+
+    COMPILED_FIELDS = ("m", "alphabet", "states", "final_states", "transition_table",
+                       "symbol_codes", "stride", "dense_table", "final_offsets", "byte_codes")
+
+    def __init__(self, maxsize=128):
+        if maxsize < 0:
+            raise ValueError("O tamanho máximo da cache não pode ser negativo.")
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        """
+        Devolve os atributos compilados para a chave (ou None) e marca-a como usada
+
+        """
+        compiled = self.entries.get(key)
+        if compiled is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return compiled
+
+    def put(self, key, automaton):
+        """
+        Guarda as tabelas de um autómato já compilado, descartando a entrada usada há mais tempo
+
+        """
+        if self.maxsize == 0:
+            return
+        self.entries[key] = {field: getattr(automaton, field) for field in self.COMPILED_FIELDS}
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def cache_info(self):
+        """
+        Estatísticas no formato de functools.lru_cache
+
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.entries))
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    def save(self, path):
+        """
+        Escreve as tabelas em cache num ficheiro JSON (a tabela densa é reconstruída ao carregar)
+
+        """
+        entries = []
+        for (kind, pattern, alphabet), compiled in self.entries.items():
+            entries.append({
+                "class": kind,
+                "pattern": pattern,
+                "alphabet": compiled["alphabet"],
+                "key_alphabet": list(alphabet),
+                "m": compiled["m"],
+                "num_states": len(compiled["states"]),
+                "final_states": sorted(compiled["final_states"]),
+                "transitions": [[q, a, t] for (q, a), t in compiled["transition_table"].items()],
+            })
+        with open(path, "w") as f:
+            json.dump({"version": 1, "entries": entries}, f)
+
+    def load(self, path):
+        """
+        Acrescenta à cache as tabelas guardadas com save. Retorna o número de entradas lidas.
+
+        """
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != 1:
+            raise ValueError("Formato de cache de autómatos desconhecido.")
+        for entry in data["entries"]:
+            automaton = Automata.__new__(Automata) #Só para reconstruir a tabela densa.
+            automaton.m = entry["m"]
+            automaton.alphabet = entry["alphabet"]
+            automaton.states = list(range(entry["num_states"]))
+            automaton.final_states = set(entry["final_states"])
+            automaton.transition_table = {(q, a): t for q, a, t in entry["transitions"]}
+            automaton.build_dense_table()
+            self.put((entry["class"], entry["pattern"], tuple(entry["key_alphabet"])), automaton)
+        return len(data["entries"])
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+automata_cache = AutomataCache()
+
+
+class AhoCorasick:
+    """
+    Autómato de Aho-Corasick: procura vários padrões numa única passagem pela sequência
+
+    """
+
+    def __init__(self, patterns, determinise=False):
+        """
+        Constrói a trie dos padrões (goto), as ligações de falha e as saídas.
+        Se determinise for True, calcula também a tabela de transições completa,
+        para que cada símbolo da sequência custe uma única consulta.
+
+        """
+        self.patterns = list(patterns)
+        if not self.patterns or not all(self.patterns):
+            raise ValueError("É preciso pelo menos um padrão e os padrões não podem ser vazios.")
+
+        self.goto = [{}] #goto[s][a] = estado seguinte na trie.
+        self.output = [[]] #output[s] = padrões que terminam no estado s.
+        for pattern_id, pattern in enumerate(self.patterns): #Insere cada padrão na trie.
+            state = 0
+            for symbol in pattern:
+                if symbol not in self.goto[state]:
+                    self.goto.append({})
+                    self.output.append([])
+                    self.goto[state][symbol] = len(self.goto) - 1
+                state = self.goto[state][symbol]
+            self.output[state].append(pattern_id)
+
+        self.fail = [0] * len(self.goto) #fail[s] = maior sufixo próprio do prefixo de s que também é prefixo na trie.
+        self.order = [] #Estados por ordem de profundidade (BFS).
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            self.order.append(state)
+            for symbol, child in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and symbol not in self.goto[fallback]: #Segue as falhas até encontrar a transição.
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(symbol, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]] #Herda as saídas do estado de falha.
+                queue.append(child)
+
+        self.delta = None
+        if determinise:
+            self.delta = self.build_transition_table()
+
+    def build_transition_table(self):
+        """
+        Determiniza o autómato: delta[s][a] para todos os símbolos dos padrões
+
+        """
+        alphabet = sorted({symbol for pattern in self.patterns for symbol in pattern})
+        delta = [None] * len(self.goto)
+        delta[0] = {a: self.goto[0].get(a, 0) for a in alphabet}
+        for state in self.order: #A falha de um estado é sempre menos profunda, já está calculada.
+            row = dict(delta[self.fail[state]])
+            row.update(self.goto[state])
+            delta[state] = row
+        return delta
+
+    def iter_matches(self, sequence):
+        """
+        Gerador de pares (pattern_id, posição inicial), por ordem da posição onde cada ocorrência termina
+
+        """
+        state = 0
+        for i, symbol in enumerate(sequence):
+            if self.delta is not None:
+                state = self.delta[state].get(symbol, 0)
+            else:
+                while state and symbol not in self.goto[state]:
+                    state = self.fail[state]
+                state = self.goto[state].get(symbol, 0)
+            for pattern_id in self.output[state]:
+                yield pattern_id, i - len(self.patterns[pattern_id]) + 1
+
+    def find_matches(self, sequence):
+        """
+        Retorna a lista de pares (pattern_id, posição) de todas as ocorrências
+
+        """
+        return list(self.iter_matches(sequence))
+
+
+IUPAC_CODES = {
+    "A": "A", "C": "C", "G": "G", "T": "T", "U": "T",
+    "R": "AG", "Y": "CT", "S": "CG", "W": "AT", "K": "GT", "M": "AC",
+    "B": "CGT", "D": "AGT", "H": "ACT", "V": "ACG", "N": "ACGT",
+}
+
+
+def parse_degenerate(pattern):
+    """
+    Converte um padrão com códigos IUPAC e classes entre parênteses retos (ex.: "GG[AT]NCC")
+    numa lista de conjuntos de símbolos, um por posição. Outros caracteres são literais.
+
+    """
+    classes = []
+    i = 0
+    while i < len(pattern):
+        if pattern[i] == "[":
+            end = pattern.find("]", i)
+            if end < 0:
+                raise ValueError("Classe de caracteres sem ']' no padrão.")
+            symbols = set()
+            for c in pattern[i + 1:end]:
+                symbols.update(IUPAC_CODES.get(c, c))
+            if not symbols:
+                raise ValueError("Classe de caracteres vazia no padrão.")
+            classes.append(frozenset(symbols))
+            i = end + 1
+        else:
+            classes.append(frozenset(IUPAC_CODES.get(pattern[i], pattern[i])))
+            i += 1
+    return classes
+
+
+class IUPACAutomata(Automata):
+    """
+    Autómato para padrões degenerados (códigos IUPAC e classes de caracteres).
+    O AFN que reconhece Σ*P é determinizado por construção de subconjuntos e o
+    AFD resultante é minimizado, ficando um único autómato de uma só passagem.
+
+    """
+
+    def __init__(self, pattern, sequence="", cache=True):
+        self.classes = parse_degenerate(pattern) if pattern else []
+        if len(self.classes) < 2:
+            raise ValueError("O padrão deve conter pelo menos duas posições.")
+        super().__init__(pattern, sequence, cache)
+
+    def build_transition_table(self):
+        """
+        Constrói o AFD por construção de subconjuntos e minimiza-o.
+        Atualiza m, alphabet, states e final_states para o autómato obtido.
+
+        """
+        self.m = len(self.classes) #Comprimento das ocorrências (uma posição por classe).
+        self.alphabet = sorted(set().union(*self.classes))
+
+        start = frozenset([0])
+        subsets = {start: 0} #Subconjunto de estados do AFN -> estado do AFD.
+        queue = deque([start])
+        delta = {}
+        while queue:
+            subset = queue.popleft()
+            for a in self.alphabet:
+                target = frozenset([0] + [i + 1 for i in subset if i < self.m and a in self.classes[i]])
+                if target not in subsets:
+                    subsets[target] = len(subsets)
+                    queue.append(target)
+                delta[(subsets[subset], a)] = subsets[target]
+        finals = {q for subset, q in subsets.items() if self.m in subset}
+
+        return self.minimize(len(subsets), delta, finals)
+
+    def minimize(self, num_states, delta, finals):
+        """
+        Minimiza o AFD por refinamento de partições (algoritmo de Moore).
+        O bloco do estado inicial passa a ser o estado 0.
+
+        """
+        block = [1 if q in finals else 0 for q in range(num_states)]
+        while True:
+            signatures = {}
+            new_block = []
+            for q in range(num_states): #Dois estados ficam juntos se tinham o mesmo bloco e vão para os mesmos blocos.
+                signature = (block[q],) + tuple(block[delta[(q, a)]] for a in self.alphabet)
+                new_block.append(signatures.setdefault(signature, len(signatures)))
+            if len(signatures) == len(set(block)):
+                break
+            block = new_block
+
+        order = {} #Renumerar os blocos pela ordem em que aparecem (o estado inicial 0 fica com 0).
+        for q in range(num_states):
+            order.setdefault(block[q], len(order))
+        self.states = list(range(len(order)))
+        self.final_states = {order[block[q]] for q in finals}
+        return {(order[block[q]], a): order[block[delta[(q, a)]]] for q in range(num_states) for a in self.alphabet}
+
+
+class ApproximateAutomata:
+    """
+    Procura aproximada bit-paralela, com a mesma interface de Automata.
+    mode="mismatch": Shift-And com k diferenças por substituição (Wu-Manber);
+    devolve pares (posição inicial, erros).
+    mode="edit": algoritmo de Myers para a distância de edição; devolve pares
+    (posição final, erros), já que a posição inicial depende do alinhamento.
+    Cada estado é um inteiro com um bit por posição do padrão, por isso padrões
+    maiores do que uma palavra da máquina continuam a funcionar (em várias palavras).
+
+    """
+
+    MODES = ("mismatch", "edit")
+
+    def __init__(self, pattern, sequence="", max_errors=1, mode="mismatch"):
+        if not pattern or len(pattern) < 2:
+            raise ValueError("O padrão deve conter pelo menos dois caracteres.")
+        if mode not in self.MODES:
+            raise ValueError(f"Modo desconhecido: {mode!r}. Use 'mismatch' ou 'edit'.")
+        if not 0 <= max_errors < len(pattern):
+            raise ValueError("max_errors deve estar entre 0 e o comprimento do padrão - 1.")
+
+        self.pattern = pattern
+        self.sequence = sequence
+        self.max_errors = max_errors
+        self.mode = mode
+        self.m = len(pattern)
+        self.alphabet = sorted(set(pattern))
+        self.full_mask = (1 << self.m) - 1
+        self.high_bit = 1 << (self.m - 1)
+        self.masks = {a: 0 for a in self.alphabet} #Bit i ligado se pattern[i] == símbolo.
+        for i, a in enumerate(pattern):
+            self.masks[a] |= 1 << i
+        self._matches = None
+
+    @property
+    def matches(self):
+        """
+        Ocorrências aproximadas em self.sequence (calculadas no primeiro acesso)
+
+        """
+        if self._matches is None:
+            self._matches = self.find_matches()
+        return self._matches
+
+    def iter_matches(self, sequence=None):
+        """
+        Gerador de pares (posição, número de erros) com erros <= max_errors,
+        pela ordem em que são encontrados
+
+        """
+        if sequence is None:
+            sequence = self.sequence
+        if isinstance(sequence, (bytes, bytearray, memoryview)):
+            sequence = bytes(sequence).decode("latin-1")
+        if self.mode == "mismatch":
+            return self._scan_mismatch(sequence)
+        return self._scan_edit(sequence)
+
+    def find_matches(self, sequence=None):
+        """
+        Retorna a lista de pares (posição, número de erros)
+
+        """
+        return list(self.iter_matches(sequence))
+
+    def _scan_mismatch(self, sequence):
+        """
+        R[j] tem o bit i ligado se pattern[:i+1] termina na posição atual com no máximo j substituições
+
+        """
+        masks, full, high, k = self.masks, self.full_mask, self.high_bit, self.max_errors
+        shift = self.m - 1
+        R = [0] * (k + 1)
+        for pos, symbol in enumerate(sequence):
+            eq = masks.get(symbol, 0)
+            previous = R[0]
+            R[0] = ((previous << 1) | 1) & eq
+            for j in range(1, k + 1):
+                current = R[j]
+                R[j] = ((((current << 1) | 1) & eq) | ((previous << 1) | 1)) & full #Acerto com j erros ou substituição a partir de j-1.
+                previous = current
+            if R[k] & high and pos >= shift:
+                errors = next(j for j in range(k + 1) if R[j] & high)
+                yield pos - shift, errors
+
+    def _scan_edit(self, sequence):
+        """
+        Algoritmo de Myers (1999): Pv/Mv codificam as diferenças verticais da última
+        coluna da matriz de programação dinâmica e score é o valor da última linha
+
+        """
+        masks, full, high, k = self.masks, self.full_mask, self.high_bit, self.max_errors
+        pv, mv, score = full, 0, self.m
+        for pos, symbol in enumerate(sequence):
+            eq = masks.get(symbol, 0)
+            xv = eq | mv
+            xh = ((((eq & pv) + pv) & full) ^ pv) | eq
+            ph = (mv | ~(xh | pv)) & full
+            mh = pv & xh
+            if ph & high:
+                score += 1
+            elif mh & high:
+                score -= 1
+            ph = (ph << 1) & full #A primeira linha é sempre 0: a ocorrência pode começar em qualquer posição.
+            mh = (mh << 1) & full
+            pv = (mh | ~(xv | ph)) & full
+            mv = ph & xv
+            if score <= k:
+                yield pos, score
+
+
 #Exemplo
 teste = Automata("ACA", "CACAACAAACA")
 print(teste.alphabet)
@@ -1,5 +1,7 @@
+import os
+import tempfile
 import unittest
-from AF import Automata
+from AF import Automata, AhoCorasick, ApproximateAutomata, AutomataCache, IUPACAutomata, automata_cache, parse_degenerate, read_fasta
 from unittest.mock import patch, MagicMock
 
 class TestAutomatosFinitos(unittest.TestCase):
@@ -82,6 +84,18 @@ class TestAutomatosFinitos(unittest.TestCase):
         self.assertEqual(len(self.af1.transition_table), len(self.af1.states) * len(self.af1.alphabet),
                         "A tabela de transição deve ter entradas state × alphabet")
     
+    def test_transition_table_matches_overlap_definition(self):
+        """
+        Verifica que a construção pela função de falha dá a mesma tabela que max_overlap
+        """
+        for pattern in ["ACA", "ACGTACGA", "AAAAB", "ABABABCABAB", "GATTACAGATTA"]:
+            af = Automata(pattern, "")
+            for q in af.states:
+                for a in af.alphabet:
+                    with self.subTest(pattern=pattern, q=q, a=a):
+                        expected = af.max_overlap(pattern[:q] + a, pattern)
+                        self.assertEqual(af.transition_table[(q, a)], expected)
+
     def test_process_sequence(self):
         """
         Verifica se a sequência de estados está correta ao processar uma sequência de entrada
@@ -119,6 +133,235 @@ class TestAutomatosFinitos(unittest.TestCase):
         self.assertEqual(self.af3.matches, [],
                         "Deve retornar lista vazia quando o padrão não é encontrado")
     
+    def test_dense_table(self):
+        """
+        Verifica que a tabela densa tem as mesmas transições que o dicionário
+        """
+        af = self.af1
+        for (q, a), next_state in af.transition_table.items():
+            offset = af.dense_table[q * af.stride + af.symbol_codes[a]]
+            self.assertEqual(offset, next_state * af.stride)
+        # Símbolos fora do alfabeto voltam sempre ao estado 0
+        other = len(af.alphabet)
+        self.assertTrue(all(af.dense_table[q * af.stride + other] == 0 for q in af.states))
+
+    def test_encoded_scan_inputs(self):
+        """
+        Verifica que str, bytes e símbolos fora de latin-1 dão os mesmos resultados
+        """
+        self.assertEqual(self.af1.encode("ACGT"), bytes([0, 1, 2, 2]))
+        self.assertEqual(self.af1.find_matches(b"CACAACAAACA"), [1, 4, 8])
+        self.assertEqual(self.af1.find_matches("ACA\u03b1ACA"), [0, 4])
+
+    def test_find_matches_parallel(self):
+        """
+        Verifica que a procura por blocos em paralelo dá o mesmo resultado que a sequencial,
+        incluindo ocorrências que atravessam a fronteira entre blocos
+        """
+        af = Automata("ACAAC")
+        sequence = "ACAACAACAAC" * 7 + "GT" + "ACAAC"
+        expected = af.find_matches(sequence)
+        for chunk_size in (1, 3, 5, 8, 1000):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(af.find_matches_parallel(sequence, processes=2, chunk_size=chunk_size), expected)
+        self.assertEqual(af.find_matches_parallel("", processes=2), [])
+
+    def test_find_matches_fasta(self):
+        """
+        Verifica a procura paralela em todos os registos de um ficheiro FASTA
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "seqs.fa")
+            with open(path, "w") as f:
+                f.write(">seq1 primeira\nCACAA\nCAAACA\n>seq2\nGGGG\n>seq3\nACA\n")
+            self.assertEqual(list(read_fasta(path)), [("seq1", "CACAACAAACA"), ("seq2", "GGGG"), ("seq3", "ACA")])
+            result = self.af1.find_matches_fasta(path, processes=2, chunk_size=4)
+        self.assertEqual(result, {"seq1": [1, 4, 8], "seq2": [], "seq3": [0]})
+
+    def test_find_matches_file(self):
+        """
+        Verifica a procura num ficheiro mapeado em memória, com o padrão partido entre linhas e blocos
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            fasta = os.path.join(tmp, "seqs.fa")
+            with open(fasta, "w") as f:
+                f.write(">seq1 primeira\r\nCACAA\r\nCAAACA\r\n>seq2\nGGGG\n>seq3\nACA")
+            plain = os.path.join(tmp, "seq.txt")
+            with open(plain, "w") as f:
+                f.write("CACAAC\nAAACA\n")
+            empty = os.path.join(tmp, "empty.txt")
+            open(empty, "w").close()
+            for block_size in (1, 2, 3, 1 << 20):
+                with self.subTest(block_size=block_size):
+                    self.assertEqual(self.af1.find_matches_file(fasta, block_size),
+                                     {"seq1": [1, 4, 8], "seq2": [], "seq3": [0]})
+                    self.assertEqual(list(self.af1.iter_file_matches(fasta, block_size)),
+                                     [("seq1", 1), ("seq1", 4), ("seq1", 8), ("seq3", 0)])
+                    self.assertEqual(self.af1.find_matches_file(plain, block_size), {"": [1, 4, 8]})
+            self.assertEqual(self.af1.find_matches_file(empty), {})
+            for block_size in (0, -1):
+                with self.assertRaises(ValueError):
+                    self.af1.find_matches_file(plain, block_size)
+                with self.assertRaises(ValueError):
+                    list(self.af1.iter_file_matches(plain, block_size))
+
+    def test_automata_cache(self):
+        """
+        Verifica que autómatos repetidos reutilizam as tabelas da cache e que a cache respeita o limite LRU
+        """
+        automata_cache.clear()
+        first = Automata("ACGA", "ACGACGA")
+        second = Automata("ACGA", "TTACGA")
+        self.assertIs(second.dense_table, first.dense_table)
+        self.assertEqual(second.matches, [2])
+        self.assertEqual(automata_cache.cache_info(), (1, 1, 128, 1))
+        iupac = IUPACAutomata("ACGA")
+        self.assertIsNot(iupac.transition_table, first.transition_table)
+        self.assertEqual(Automata("ACGA", cache=False).transition_table, first.transition_table)
+        self.assertEqual(len(automata_cache), 2)
+
+        cache = AutomataCache(maxsize=2)
+        for key in ("a", "b", "a", "c"):
+            if cache.get(key) is None:
+                cache.put(key, first)
+        self.assertNotIn("b", cache)
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        self.assertEqual(cache.cache_info(), (1, 3, 2, 2))
+        cache.clear()
+        self.assertEqual(cache.cache_info(), (0, 0, 2, 0))
+        self.assertRaises(ValueError, AutomataCache, -1)
+
+    def test_automata_cache_save_load(self):
+        """
+        Verifica que as tabelas guardadas em disco voltam a dar os mesmos autómatos
+        """
+        automata_cache.clear()
+        af = Automata("ACA")
+        iupac = IUPACAutomata("RYN")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "automata.json")
+            automata_cache.save(path)
+            restored = AutomataCache()
+            self.assertEqual(restored.load(path), 2)
+            automata_cache.clear()
+            automata_cache.load(path)
+        for original in (af, iupac):
+            compiled = restored.get((type(original).__name__, original.pattern, tuple(sorted(set(original.pattern)))))
+            self.assertEqual(compiled["transition_table"], original.transition_table)
+            self.assertEqual(compiled["dense_table"], original.dense_table)
+            self.assertEqual(compiled["final_offsets"], original.final_offsets)
+            self.assertEqual(compiled["byte_codes"], original.byte_codes)
+        self.assertEqual(IUPACAutomata("RYN", "GCATA").matches, [0, 2])
+        self.assertEqual(automata_cache.cache_info().hits, 1)
+
+    def test_approximate_mismatch(self):
+        """
+        Verifica a procura com substituições: com 0 erros coincide com Automata
+        """
+        self.assertEqual(ApproximateAutomata("ACA", "CACAACAAACA", max_errors=0).matches,
+                         [(pos, 0) for pos in self.af1.matches])
+        self.assertEqual(ApproximateAutomata("ACGT", "ACGTTCGTAGGT", max_errors=1).matches,
+                         [(0, 0), (4, 1), (8, 1)])
+        self.assertEqual(ApproximateAutomata("ACGT", b"ACCTAAGT", max_errors=2).matches,
+                         [(0, 1), (4, 1)])
+        pattern = "ACGT" * 20 #Mais de 64 posições: o estado ocupa várias palavras.
+        sequence = "TT" + pattern[:30] + "A" + pattern[31:] + "TT"
+        self.assertEqual(ApproximateAutomata(pattern, sequence, max_errors=1).matches, [(2, 1)])
+
+    def test_approximate_edit(self):
+        """
+        Verifica a procura com distância de edição (posições finais)
+        """
+        af = ApproximateAutomata("ACGT", mode="edit", max_errors=1)
+        self.assertEqual(af.find_matches("TTACGTTT"), [(4, 1), (5, 0), (6, 1)])
+        self.assertEqual(af.find_matches("ACTTT"), [(2, 1), (3, 1)])   #Remoção do G; ACT+T.
+        self.assertEqual(af.find_matches("AACGGT"), [(3, 1), (4, 1), (5, 1)])
+        self.assertEqual(af.find_matches(""), [])
+        pattern = "ACGT" * 20
+        sequence = pattern[:40] + pattern[41:]
+        self.assertEqual(ApproximateAutomata(pattern, sequence, max_errors=1, mode="edit").matches,
+                         [(len(sequence) - 1, 1)])
+
+    def test_approximate_invalid(self):
+        self.assertRaises(ValueError, ApproximateAutomata, "A")
+        self.assertRaises(ValueError, ApproximateAutomata, "ACGT", max_errors=4)
+        self.assertRaises(ValueError, ApproximateAutomata, "ACGT", max_errors=-1)
+        self.assertRaises(ValueError, ApproximateAutomata, "ACGT", mode="indel")
+
+    def test_parse_degenerate(self):
+        self.assertEqual(parse_degenerate("GW[AC]N"),
+                         [{"G"}, {"A", "T"}, {"A", "C"}, {"A", "C", "G", "T"}])
+        with self.assertRaises(ValueError):
+            parse_degenerate("GG[AC")
+
+    def test_iupac_automata(self):
+        """
+        Verifica que o autómato degenerado encontra o mesmo que a expansão em padrões literais
+        """
+        sequence = "TATAAATTATATATGGACCGGTCCTATATAAGGACC"
+        for pattern in ["TATAWAW", "GGNCC", "[AG]G[AC]C", "TAT"]:
+            classes = parse_degenerate(pattern)
+            expected = [i for i in range(len(sequence) - len(classes) + 1)
+                        if all(sequence[i + j] in c for j, c in enumerate(classes))]
+            with self.subTest(pattern=pattern):
+                af = IUPACAutomata(pattern, sequence)
+                self.assertEqual(af.matches, expected)
+                self.assertEqual(af.find_matches(sequence.encode()), expected)
+
+    def test_iupac_automata_is_minimal(self):
+        # Para um padrão literal o AFD mínimo tem m + 1 estados, como o da classe base
+        af = IUPACAutomata("ACGTACGA")
+        self.assertEqual(len(af.states), 9)
+        self.assertEqual(af.find_matches("ACGTACGTACGA"), Automata("ACGTACGA").find_matches("ACGTACGTACGA"))
+        with self.assertRaises(ValueError):
+            IUPACAutomata("[AT]")
+
+    def test_lazy_matches(self):
+        """
+        Verifica que nada é calculado sobre a sequência até ser pedido
+        """
+        with patch.object(Automata, 'process_sequence') as mock_process:
+            af = Automata("ACA", "CACAACAAACA")
+            mock_process.assert_not_called()
+        self.assertIsNone(af._matches)
+        self.assertIsNone(af._table)
+        self.assertEqual(af.matches, [1, 4, 8])
+
+    def test_iter_matches_other_sequence(self):
+        """
+        Verifica que o mesmo autómato pode ser aplicado a várias sequências como gerador
+        """
+        af = Automata("ACA")
+        matches = af.iter_matches(iter("CACAACAAACA"))
+        self.assertEqual(next(matches), 1)
+        self.assertEqual(list(matches), [4, 8])
+        self.assertEqual(af.find_matches("ACACA"), [0, 2])
+        self.assertEqual(af.matches, [])
+
+    def test_aho_corasick(self):
+        """
+        Verifica que o autómato de Aho-Corasick encontra todos os padrões numa só passagem
+        """
+        patterns = ["ACA", "CA", "AAC", "GT", "CAACA"]
+        sequence = "CACAACAAACA"
+        expected = sorted((pid, i) for pid, p in enumerate(patterns)
+                          for i in range(len(sequence)) if sequence.startswith(p, i))
+        for determinise in (False, True):
+            with self.subTest(determinise=determinise):
+                ac = AhoCorasick(patterns, determinise=determinise)
+                self.assertEqual(sorted(ac.find_matches(sequence)), expected)
+                self.assertEqual(ac.find_matches("GGG"), [])
+
+    def test_aho_corasick_single_pattern_agrees_with_automata(self):
+        ac = AhoCorasick(["ACGT"], determinise=True)
+        self.assertEqual([pos for _, pos in ac.iter_matches(self.sequence2)], self.af2.matches)
+
+    def test_aho_corasick_invalid_patterns(self):
+        with self.assertRaises(ValueError):
+            AhoCorasick([])
+        with self.assertRaises(ValueError):
+            AhoCorasick(["ACA", ""])
+
     @patch('AF.PrettyTable')
     def test_print_table(self, mock_pretty_table):
         """
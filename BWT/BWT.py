@@ -1,11 +1,670 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+
+
+def suffix_array(text):
+    """
+    Returns the starting positions of the rotations of text in sorted order.
+
+    Uses prefix doubling over the integer-encoded text: after round k every
+    rotation is ranked by its first 2^k characters. Ranks are only sorted and
+    compacted once the combined keys grow large, and the loop stops as soon as
+    all ranks are distinct. For a text ending in a unique '$' this is the
+    suffix array. Accepts a str or a sequence of integer symbol codes.
+    """
+    n = len(text)
+    if n == 0:
+        return []
+
+    symbols = sorted(set(text))
+    code = {s: i for i, s in enumerate(symbols)} # Codificar cada símbolo pela sua ordem no alfabeto
+    rank = [code[s] for s in text]
+    num_ranks = len(symbols)
+
+    k = 1
+    sa = None
+    distinct = False
+    while k < n and not distinct:
+        shifted = rank[k:] + rank[:k] # rank[(i + k) % n] para cada i
+        rank = [r * num_ranks + s for r, s in zip(rank, shifted)] # Par (rank[i], rank[i + k]) codificado num inteiro
+        num_ranks *= num_ranks
+        k *= 2
+
+        if num_ranks * num_ranks < 1 << 128 and k < n:
+            continue # Enquanto as chaves forem pequenas não é preciso ordenar
+
+        sa = sorted(range(n), key=rank.__getitem__)
+        new_rank = [0] * n
+        r = 0
+        prev = rank[sa[0]]
+        for i in sa:
+            if rank[i] != prev: # Nova classe sempre que o par muda
+                r += 1
+                prev = rank[i]
+            new_rank[i] = r
+        rank = new_rank
+        num_ranks = r + 1
+        distinct = num_ranks == n # Todas as rotações já estão ordenadas
+
+    if sa is None: # Texto com um único caractere
+        sa = [0]
+    return sa
+
+
+_INDEX_MAGIC = b"FMINDEX1" # Identifica os ficheiros escritos por FMIndex.save
+_INDEX_HEADER = struct.Struct("=8sqqqqqq") # magic, n, step, sa_sample, sa_mode, n_samples, len(alphabet)
+_RECORDS_MAGIC = b"FMRECS01" # Tabela de registos acrescentada por MultiSequenceBWT.save
+_RECORDS_TRAILER = struct.Struct("=q8s") # tamanho da tabela (JSON), magic
+
+
+class _MappedText:
+    """
+    Read-only str-like view of a latin-1 encoded text stored in a memory map.
+    Supports the operations FMIndex and BWT need: len, indexing, slicing,
+    iteration, membership and count.
+    """
+
+    def __init__(self, buf, offset, length):
+        self.buf = buf
+        self.offset = offset
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, _ = i.indices(self.length)
+            return self.buf[self.offset + start:self.offset + max(start, stop)].decode("latin-1")
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError("index out of range")
+        return chr(self.buf[self.offset + i])
+
+    def __iter__(self):
+        for start in range(0, self.length, 1 << 16): # Descodificar por blocos
+            yield from self[start:start + (1 << 16)]
+
+    def __contains__(self, c):
+        return self.buf.find(c.encode("latin-1"), self.offset, self.offset + self.length) >= 0
+
+    def __str__(self):
+        return self[:]
+
+    def count(self, c, start=0, end=None):
+        start, end, _ = slice(start, end).indices(self.length)
+        return self.buf[self.offset + start:self.offset + end].count(c.encode("latin-1"))
+
+
+class FMIndex:
+    """
+    FM-index built once from a BWT string.
+
+    Keeps the C table (number of symbols smaller than each symbol) and
+    occurrence checkpoints every `step` rows, so rank and LF queries cost
+    O(step) and a backward search costs O(m) per pattern, independently of
+    the size of the text.
+
+    If a suffix array is given, only the entries whose text position is a
+    multiple of sa_sample are kept; locate() recovers the others by walking
+    the LF mapping until it reaches a sampled row (at most sa_sample - 1 steps).
+    """
+
+    def __init__(self, bwt, step=32, sa=None, sa_sample=1):
+        if sa_sample < 1:
+            raise ValueError("sa_sample must be at least 1.")
+
+        self.bwt = bwt
+        self.n = len(bwt)
+        self.step = step
+        self.alphabet = sorted(set(bwt))
+
+        self.C = {} # C[c] = número de símbolos da BWT menores que c
+        total = 0
+        for c in self.alphabet:
+            self.C[c] = total
+            total += bwt.count(c)
+
+        self.occ = {c: array('q') for c in self.alphabet} # occ[c][k] = ocorrências de c em bwt[:k * step]
+        counts = dict.fromkeys(self.alphabet, 0)
+        for start in range(0, self.n + 1, step):
+            for c in self.alphabet:
+                self.occ[c].append(counts[c])
+                counts[c] += bwt.count(c, start, start + step) # Contagem do bloco seguinte
+
+        self._sample_sa(sa, sa_sample)
+
+    def _sample_sa(self, sa, sa_sample, keep=()):
+        """
+        Keeps the suffix array entries whose text position is a multiple of
+        sa_sample or belongs to keep.
+        """
+        self.sa_sample = sa_sample
+        self.sa_rows = None # Linhas amostradas, por ordem crescente (None se o array estiver completo)
+        self.sa_values = None # Posição no texto de cada linha amostrada
+        if sa is not None:
+            if sa_sample == 1:
+                self.sa_values = sa # Array completo: não é preciso copiar
+            else:
+                self.sa_rows = array('q')
+                self.sa_values = array('q')
+                for row, pos in enumerate(sa):
+                    if pos % sa_sample == 0 or pos in keep:
+                        self.sa_rows.append(row)
+                        self.sa_values.append(pos)
+
+    def rank(self, c, i):
+        """
+        Returns the number of occurrences of c in bwt[:i].
+        """
+        occ = self.occ.get(c)
+        if occ is None:
+            return 0
+        k = i // self.step
+        return occ[k] + self.bwt.count(c, k * self.step, i) # Checkpoint mais a contagem dentro do bloco
+
+    def char_at(self, i):
+        """
+        Returns the BWT symbol at row i.
+        """
+        return self.bwt[i]
+
+    def lf(self, i):
+        """
+        Last-to-first mapping of row i.
+        """
+        c = self.bwt[i]
+        return self.C[c] + self.rank(c, i)
+
+    def backward_search(self, pattern):
+        """
+        Returns the half-open interval [top, bottom) of BWT rows prefixed by pattern.
+        """
+        top, bottom = 0, self.n
+        for c in reversed(pattern): # O padrão é processado do fim para o início
+            if c not in self.C:
+                return 0, 0
+            top = self.C[c] + self.rank(c, top)
+            bottom = self.C[c] + self.rank(c, bottom)
+            if top >= bottom:
+                return 0, 0
+        return top, bottom
+
+    def backward_search_many(self, patterns):
+        """
+        Backward search for several patterns at once.
+        Patterns are processed in order of their reversed strings, so patterns
+        that share a suffix reuse the intervals already computed for it.
+        Returns a dict pattern -> (top, bottom).
+        """
+        results = {}
+        stack = [(0, self.n)] # stack[d] = intervalo depois de processar os últimos d caracteres
+        prev = ""
+        for rev in sorted({p[::-1] for p in patterns}):
+            common = 0
+            limit = min(len(rev), len(prev))
+            while common < limit and rev[common] == prev[common]: # Sufixo comum com o padrão anterior
+                common += 1
+            del stack[common + 1:]
+
+            top, bottom = stack[-1]
+            for c in rev[common:]:
+                if top < bottom and c in self.C:
+                    top = self.C[c] + self.rank(c, top)
+                    bottom = self.C[c] + self.rank(c, bottom)
+                if top >= bottom or c not in self.C:
+                    top, bottom = 0, 0
+                stack.append((top, bottom))
+
+            results[rev[::-1]] = (top, bottom)
+            prev = rev
+        return results
+
+    def mismatch_lower_bounds(self, pattern):
+        """
+        Returns D, where D[i] is a lower bound on the number of mismatches
+        needed to match pattern[:i + 1] anywhere in the text.
+        pattern is cut greedily from the left into pieces that do not occur in
+        the text; every such piece needs at least one mismatch.
+        """
+        bounds = []
+        z = 0
+        start = 0
+        for i in range(len(pattern)):
+            if self.count(pattern[start:i + 1]) == 0: # Este pedaço não ocorre: pelo menos um erro
+                z += 1
+                start = i + 1
+            bounds.append(z)
+        return bounds
+
+    def approx_search(self, pattern, max_mismatches):
+        """
+        Backward search allowing up to max_mismatches substitutions.
+        Backtracks over the index, trying every symbol at every position, and
+        prunes a branch as soon as the remaining mismatch budget is below the
+        lower bound for the part of the pattern still to be matched.
+        Returns a list of (top, bottom, mismatches) row intervals.
+        """
+        bounds = self.mismatch_lower_bounds(pattern)
+        symbols = [c for c in self.alphabet if c != "$"] # O terminador nunca faz parte de um match
+        hits = []
+
+        def rec(i, budget, top, bottom):
+            if i < 0:
+                hits.append((top, bottom, max_mismatches - budget))
+                return
+            if budget < bounds[i]: # Não há erros suficientes para o resto do padrão
+                return
+            for c in symbols:
+                new_top = self.C[c] + self.rank(c, top)
+                new_bottom = self.C[c] + self.rank(c, bottom)
+                if new_top >= new_bottom:
+                    continue
+                if c == pattern[i]:
+                    rec(i - 1, budget, new_top, new_bottom)
+                elif budget > 0:
+                    rec(i - 1, budget - 1, new_top, new_bottom) # Substituição
+
+        rec(len(pattern) - 1, max_mismatches, 0, self.n)
+        return hits
+
+    def count(self, pattern):
+        """
+        Returns the number of occurrences of pattern.
+        """
+        top, bottom = self.backward_search(pattern)
+        return bottom - top
+
+    def has_sa(self):
+        """
+        Returns True if the index can locate rows in the text.
+        """
+        return self.sa_values is not None
+
+    def locate(self, row):
+        """
+        Returns the text position of the suffix in the given row.
+        """
+        if self.sa_values is None:
+            raise ValueError("Suffix array not built.")
+        if self.sa_rows is None:
+            return self.sa_values[row]
+
+        steps = 0
+        while True:
+            k = bisect_left(self.sa_rows, row)
+            if k < len(self.sa_rows) and self.sa_rows[k] == row: # Linha amostrada
+                return self.sa_values[k] + steps
+            row = self.lf(row) # Recuar uma posição no texto
+            steps += 1
+
+    def positions_many(self, patterns):
+        """
+        Returns a dict pattern -> sorted list of text positions, for all patterns.
+        """
+        if self.sa_values is None:
+            raise ValueError("Suffix array not built.")
+
+        results = {}
+        for pattern, (top, bottom) in self.backward_search_many(patterns).items():
+            results[pattern] = sorted(self.locate(row) for row in range(top, bottom))
+        return results
+
+
+    def save(self, path):
+        """
+        Writes the index (BWT, C table, occurrence checkpoints and suffix array
+        samples) to a binary file that load() can memory-map.
+        Integers are stored as 64-bit values in the native byte order.
+        """
+        try:
+            text = str(self.bwt).encode("latin-1")
+        except UnicodeEncodeError:
+            raise ValueError("Only BWTs over 8-bit symbols can be saved.")
+
+        if self.sa_values is None:
+            sa_mode, samples = 0, 0
+        elif self.sa_rows is None:
+            sa_mode, samples = 1, len(self.sa_values)
+        else:
+            sa_mode, samples = 2, len(self.sa_rows)
+
+        alphabet = "".join(self.alphabet).encode("latin-1")
+        with open(path, "wb") as f:
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, self.n, self.step, self.sa_sample,
+                                       sa_mode, samples, len(alphabet)))
+            f.write(alphabet + bytes(-len(alphabet) % 8)) # Alinhar os inteiros a 8 bytes
+            f.write(array("q", [self.C[c] for c in self.alphabet]).tobytes())
+            for c in self.alphabet:
+                f.write(array("q", self.occ[c]).tobytes())
+            if sa_mode == 2:
+                f.write(array("q", self.sa_rows).tobytes())
+            if sa_mode:
+                f.write(array("q", self.sa_values).tobytes())
+            f.write(text)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps an index written by save(). Nothing is copied: the BWT,
+        the checkpoints and the samples are read directly from the mapped
+        pages, which are shared by every process that loads the same file.
+        """
+        with open(path, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(buf) < _INDEX_HEADER.size:
+            raise ValueError("Not an FM-index file.")
+        magic, n, step, sa_sample, sa_mode, samples, sigma = _INDEX_HEADER.unpack_from(buf)
+        if magic != _INDEX_MAGIC:
+            raise ValueError("Not an FM-index file.")
+
+        view = memoryview(buf)
+        offset = _INDEX_HEADER.size
+
+        def take(count): # Próximos count inteiros de 64 bits
+            nonlocal offset
+            values = view[offset:offset + 8 * count].cast("q")
+            offset += 8 * count
+            return values
+
+        fm = cls.__new__(cls)
+        fm.n = n
+        fm.step = step
+        fm.sa_sample = sa_sample
+        fm.alphabet = list(buf[offset:offset + sigma].decode("latin-1"))
+        offset += sigma + (-sigma % 8)
+        fm.C = dict(zip(fm.alphabet, take(sigma)))
+        checkpoints = n // step + 1
+        fm.occ = {c: take(checkpoints) for c in fm.alphabet}
+        fm.sa_rows = take(samples) if sa_mode == 2 else None
+        fm.sa_values = take(samples) if sa_mode else None
+        fm.bwt = _MappedText(buf, offset, n)
+        return fm
+
+
+class RunLengthFMIndex(FMIndex):
+    """
+    Run-length encoded FM-index (r-index style).
+
+    The BWT is stored as r runs (symbol and starting row) and, for each
+    symbol, the list of its runs with the cumulative length before each
+    one, so memory grows with the number of runs instead of the length of
+    the BWT. rank and LF cost O(log r). Supports the same queries as FMIndex;
+    the suffix array samples (if any) are kept as in FMIndex.
+    """
+
+    def __init__(self, bwt, sa=None, sa_sample=1):
+        if sa_sample < 1:
+            raise ValueError("sa_sample must be at least 1.")
+
+        heads = []
+        self.run_starts = array('q')
+        self.char_runs = {} # char_runs[c] = índices das runs de c
+        self.char_cum = {} # char_cum[c][k] = ocorrências de c antes da k-ésima run de c
+        self.n = 0
+        for c, group in groupby(bwt): # Uma entrada por run
+            length = sum(1 for _ in group)
+            if c not in self.char_runs:
+                self.char_runs[c] = array('q')
+                self.char_cum[c] = array('q', [0])
+            self.char_runs[c].append(len(heads))
+            self.char_cum[c].append(self.char_cum[c][-1] + length)
+            heads.append(c)
+            self.run_starts.append(self.n)
+            self.n += length
+
+        self.run_heads = "".join(heads)
+        self.alphabet = sorted(self.char_runs)
+        self.C = {}
+        total = 0
+        for c in self.alphabet:
+            self.C[c] = total
+            total += self.char_cum[c][-1]
+        self._sample_sa(sa, sa_sample)
+
+    def num_runs(self):
+        """
+        Returns the number of runs of the BWT.
+        """
+        return len(self.run_heads)
+
+    def _run_of(self, i):
+        """
+        Index of the run that contains row i (the last run if i == n).
+        """
+        return bisect_right(self.run_starts, i) - 1
+
+    def char_at(self, i):
+        """
+        Returns the BWT symbol at row i.
+        """
+        return self.run_heads[self._run_of(i)]
+
+    def rank(self, c, i):
+        """
+        Returns the number of occurrences of c in bwt[:i].
+        """
+        runs = self.char_runs.get(c)
+        if runs is None or i <= 0:
+            return 0
+        r = self._run_of(i)
+        k = bisect_left(runs, r) # Runs de c que acabam antes da run r
+        total = self.char_cum[c][k]
+        if self.run_heads[r] == c: # Parte da run r que está antes de i
+            total += i - self.run_starts[r]
+        return total
+
+    def lf(self, i):
+        """
+        Last-to-first mapping of row i.
+        """
+        c = self.char_at(i)
+        return self.C[c] + self.rank(c, i)
+
+    def save(self, path):
+        """
+        Not supported: the on-disk format stores the plain BWT and its checkpoints.
+        """
+        raise ValueError("Only the plain FM-index can be saved.")
+
+
+_DNA_CODES = {"A": 0, "C": 1, "G": 2, "T": 3}
+_LOW_BITS = 0x5555555555555555 # Bit menos significativo de cada par de bits
+_CODE_MASKS = [code * _LOW_BITS for code in range(4)] # Código repetido nos 32 pares de uma palavra
+
+
+class PackedFMIndex(FMIndex):
+    """
+    FM-index of a DNA BWT packed at 2 bits per base.
+
+    The bases are stored 32 per 64-bit word in an array('Q'); each '$' (one
+    per record of a MultiSequenceBWT) is stored as an 'A' and the sorted rows
+    of the terminators are kept apart. Checkpoints hold the
+    counts of each base every `step` words (32-bit counts when they fit),
+    and rank counts the rest with XOR/mask tricks and int.bit_count() on
+    whole words instead of scanning characters.
+    """
+
+    def __init__(self, bwt, step=1, sa=None, sa_sample=1):
+        if sa_sample < 1:
+            raise ValueError("sa_sample must be at least 1.")
+        if "$" not in bwt or any(c not in _DNA_CODES for c in set(bwt) - {"$"}):
+            raise ValueError("The packed backend needs a BWT over A, C, G, T and '$'.")
+
+        self.n = len(bwt)
+        self.step = step
+        self.sentinels = array('q', [i for i, c in enumerate(bwt) if c == "$"]) # Linhas dos terminadores, por ordem
+        codes = bwt.replace("$", "A").translate(str.maketrans("ACGT", "\x00\x01\x02\x03")).encode("latin-1")
+        codes += bytes(-len(codes) % 32) # Completar a última palavra
+        packed = bytes(a | b << 2 | c << 4 | d << 6 for a, b, c, d in zip(codes[0::4], codes[1::4], codes[2::4], codes[3::4]))
+        self.words = array('Q')
+        self.words.frombytes(packed)
+        if sys.byteorder == "big":
+            self.words.byteswap() # A base j de cada palavra tem de ficar nos bits 2j e 2j + 1
+
+        self.alphabet = sorted(set(bwt))
+        typecode = 'I' if self.n < 1 << 32 else 'q'
+        self.occ = {c: array(typecode) for c in _DNA_CODES} # occ[c][k] = ocorrências de c antes da palavra k * step
+        counts = dict.fromkeys(_DNA_CODES, 0)
+        for w, word in enumerate(self.words):
+            if w % step == 0:
+                for c in _DNA_CODES:
+                    self.occ[c].append(counts[c])
+            for c, code in _DNA_CODES.items():
+                counts[c] += self._word_count(word, code, 32)
+        for c in _DNA_CODES:
+            self.occ[c].append(counts[c]) # Checkpoint depois da última palavra
+
+        self.C = {}
+        total = 0
+        for c in self.alphabet:
+            self.C[c] = total
+            total += self.rank(c, self.n)
+        self._sample_sa(sa, sa_sample)
+
+    @staticmethod
+    def _word_count(word, code, length):
+        """
+        Number of the first `length` bases of a packed word equal to code.
+        """
+        diff = word ^ _CODE_MASKS[code] # Pares iguais ao código ficam a 00
+        equal = ~(diff | diff >> 1) & _LOW_BITS
+        if length < 32:
+            equal &= (1 << 2 * length) - 1
+        return equal.bit_count()
+
+    def char_at(self, i):
+        """
+        Returns the BWT symbol at row i.
+        """
+        k = bisect_left(self.sentinels, i)
+        if k < len(self.sentinels) and self.sentinels[k] == i:
+            return "$"
+        return "ACGT"[self.words[i >> 5] >> 2 * (i & 31) & 3]
+
+    def rank(self, c, i):
+        """
+        Returns the number of occurrences of c in bwt[:i].
+        """
+        if c == "$":
+            return bisect_left(self.sentinels, i)
+        code = _DNA_CODES.get(c)
+        if code is None or i <= 0:
+            return 0
+
+        word = i >> 5
+        block = word // self.step
+        total = self.occ[c][block]
+        for w in range(block * self.step, word): # Palavras completas depois do checkpoint
+            total += self._word_count(self.words[w], code, 32)
+        if i & 31: # Bases da palavra de i que estão antes de i
+            diff = self.words[word] ^ _CODE_MASKS[code]
+            total += (~(diff | diff >> 1) & _LOW_BITS & ((1 << 2 * (i & 31)) - 1)).bit_count()
+        if code == 0: # Os '$' foram guardados como 'A'
+            total -= bisect_left(self.sentinels, i)
+        return total
+
+    def lf(self, i):
+        """
+        Last-to-first mapping of row i.
+        """
+        c = self.char_at(i)
+        return self.C[c] + self.rank(c, i)
+
+    def save(self, path):
+        """
+        Not supported: the on-disk format stores the plain BWT and its checkpoints.
+        """
+        raise ValueError("Only the plain FM-index can be saved.")
+
+
+class _IndexText:
+    """
+    Read-only str-like view of the BWT held by a compressed index
+    (RunLengthFMIndex or PackedFMIndex), built on char_at() and rank().
+    """
+
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return self.index.n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return "".join(self.index.char_at(j) for j in range(*i.indices(self.index.n)))
+        if i < 0:
+            i += self.index.n
+        if not 0 <= i < self.index.n:
+            raise IndexError("index out of range")
+        return self.index.char_at(i)
+
+    def __iter__(self):
+        for i in range(self.index.n):
+            yield self.index.char_at(i)
+
+    def __contains__(self, c):
+        return c in self.index.C
+
+    def __str__(self):
+        return "".join(self)
+
+    def count(self, c, start=0, end=None):
+        start, end, _ = slice(start, end).indices(self.index.n)
+        return max(0, self.index.rank(c, end) - self.index.rank(c, start))
+
+
+_worker_index = None # FM-index partilhado pelos processos de bw_matching_pos_batch
+
+
+def _init_worker(fm_index):
+    """
+    Process pool initializer: keeps the index in a global of the worker.
+    """
+    global _worker_index
+    _worker_index = fm_index
+
+
+def _positions_worker(patterns):
+    """
+    Process pool task: positions of a chunk of patterns.
+    """
+    return _worker_index.positions_many(patterns)
+
+
 class BWT:
-    def __init__(self, seq="", buildsufarray=False, encoded=False):
+    def __init__(self, seq="", buildsufarray=False, encoded=False, occ_step=32, sa_sample=1, backend="fm"):
         """
         Initialize the BWT class.
         If encoded is True, sets self.bwt to the given sequence.
         Otherwise, builds the BWT and optionally the suffix array.
+        occ_step is the spacing (in characters) of the occurrence checkpoints
+        of the FM-index; the packed backend rounds it down to whole 32-base
+        words and the rle backend, which counts per run, ignores it.
+        With sa_sample > 1 only every sa_sample-th suffix array entry is kept
+        (inside the FM-index) and self.sa is not set.
+        backend selects the index: "fm" (FMIndex), "rle" (RunLengthFMIndex)
+        or "packed" (PackedFMIndex, DNA only). With the compressed backends the
+        BWT string is dropped once the index is built and self.bwt becomes a
+        read-only view of the index.
         """
+        if backend not in ("fm", "rle", "packed"):
+            raise ValueError("Unknown backend: %r" % (backend,))
+
         self.seq = seq
+        self.encoded = encoded
+        self.occ_step = occ_step
+        self.sa_sample = sa_sample
+        self.backend = backend
+        self.fm_index = None # Construído na primeira pesquisa
 
         if encoded:
             self.bwt = seq  # The input is already a BWT string
@@ -14,28 +673,25 @@ class BWT:
         else:
             self.bwt = ""
 
+        if backend != "fm" and self.bwt:
+            self.get_fm_index() # Trocar já a string pela representação comprimida
+
 
     def build_bwt(self, text, buildsufarray=False):
         """
         Constructs the Burrows-Wheeler Transform (BWT) of the given text.
+        The rows of the BWT matrix are obtained from the suffix array, so the
+        rotations themselves are never materialised.
         """
-        rotations = [] #Inicializa a lista
-        for i in range(len(text)):
-            rotation = text[i:] + text[:i] # Criar uma rotação movendo os primeiros i caracteres para o fim
-            rotations.append(rotation) # Adicionar a rotação à lista
+        sa = suffix_array(text) # Ordem das rotações (igual à dos sufixos quando o texto termina em '$')
 
-        rotations.sort() # Ordenar todas as rotações por ordem alfabética
-        self.rotations = rotations  # Guardar a matriz de rotações ordenadas
-
-        result = "" #Inicializar a string que irá conter o resultado da transformação BWT
-        for row in rotations:
-            result += row[-1]  # Adicionar o último caractere de cada linha da matriz à string resultante
+        result = "".join([text[i - 1] for i in sa]) # O último caractere de cada rotação é o que precede o início do sufixo
 
         if buildsufarray: # Se for pedido para construir o array de sufixos
-            self.sa = [] # Inicializar o array de sufixos
-            for row in rotations:
-                pos = row.index('$') # Encontrar a posição do símbolo terminal '$' na rotação
-                self.sa.append(len(text) - pos - 1) # Calcular e guardar a posição original do sufixo
+            if self.sa_sample == 1:
+                self.sa = sa
+            else: # Guardar só a amostra, dentro do FM-index
+                self.fm_index = self._make_index(result, sa)
 
         return result # Devolver a string transformada pela BWT
 
@@ -44,6 +700,44 @@ class BWT:
         Manually sets the BWT (used when starting from an already transformed string).
         """
         self.bwt = bwt_string
+        self.fm_index = None # O índice antigo deixa de ser válido
+
+    def get_fm_index(self):
+        """
+        Returns the FM-index of the current BWT, building it on first use.
+        """
+        if self.fm_index is None:
+            self.fm_index = self._make_index(self.bwt, getattr(self, 'sa', None))
+        if self.backend != "fm" and not isinstance(self.bwt, _IndexText):
+            self.bwt = _IndexText(self.fm_index)
+        return self.fm_index
+
+    def _make_index(self, bwt, sa):
+        """
+        Builds the index of the selected backend.
+        """
+        if self.backend == "rle":
+            return RunLengthFMIndex(bwt, sa, self.sa_sample)
+        if self.backend == "packed":
+            return PackedFMIndex(bwt, max(1, self.occ_step // 32), sa, self.sa_sample) # Checkpoints contados em palavras de 32 bases
+        return FMIndex(bwt, self.occ_step, sa, self.sa_sample)
+
+    def save(self, path):
+        """
+        Saves the FM-index of this BWT (including the suffix array, if built) to path.
+        """
+        self.get_fm_index().save(path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a BWT saved with save(), memory-mapping its index instead of rebuilding it.
+        """
+        fm = FMIndex.load(path)
+        bwt_obj = cls(encoded=True, occ_step=fm.step, sa_sample=fm.sa_sample)
+        bwt_obj.bwt = fm.bwt
+        bwt_obj.fm_index = fm
+        return bwt_obj
 
     def get_first_col(self):
         """
@@ -70,98 +764,339 @@ class BWT:
     def inverse_bwt(self):
         """
         Reconstructs the original string from the BWT.
+        Walks the LF mapping backwards from the row that starts with '$',
+        filling a preallocated buffer from the end, in O(n).
         """
-        first_col = self.get_first_col() # Obtemos a primeira coluna da matriz BWT
-        result = "" # Inicializamos uma string vazia para reconstruir a sequência original
-        c = "$" # Começamos a reconstrução a partir do símbolo terminal '$'
-        occ = 1 # Consideramos a primeira ocorrência do símbolo '$'
-
-        for _ in range(len(self.bwt)):
-            pos = self.find_ith_occ(self.bwt, c, occ) # Encontramos a posição da ocorrência atual de 'c' na coluna BWT
-            c = first_col[pos] # Saltamos para o caractere correspondente na mesma linha da primeira coluna
-            occ = 1 # Reiniciamos o número de ocorrência a contar para o próximo símbolo
-            k = pos - 1
-            while k >= 0 and first_col[k] == c: # Contamos quantas vezes o novo símbolo já apareceu acima, na primeira coluna
-                occ += 1
-                k -= 1
-            result += c # Adicionamos o novo símbolo à sequência reconstruída
+        n = len(self.bwt)
+        if n == 0:
+            return ""
+        if "$" not in self.bwt:
+            raise ValueError("The BWT must contain the terminal symbol '$'.")
 
-        return result
+        if self.backend != "fm": # LF calculado diretamente sobre o índice comprimido
+            fm = self.get_fm_index()
+            char_at, next_row = fm.char_at, fm.lf
+            row = fm.C["$"] # Primeira linha cuja rotação começa por '$'
+        else:
+            lf = self._lf_array() # Mapeamento LF calculado por contagem
+            char_at, next_row = self.bwt.__getitem__, lf.__getitem__
+            row = sum(self.bwt.count(c) for c in set(self.bwt) if c < "$")
+        result = [""] * n # Buffer pré-alocado para a sequência reconstruída
+        result[n - 1] = "$"
+        for i in range(n - 2, -1, -1):
+            result[i] = char_at(row) # O último caractere da linha precede o primeiro no texto
+            row = next_row(row)
 
-    def last_to_first(self):
+        return "".join(result)
+
+    def _lf_array(self):
         """
-        Computes the last-to-first mapping used in backward search.
+        Counting-sort construction of the last-to-first mapping as an array.
         """
-        first_col = self.get_first_col() # Obtemos a primeira coluna da matriz BWT
-        result = [] # Lista onde vamos guardar o mapeamento
+        nxt = {} # Próxima linha livre na primeira coluna para cada símbolo
+        total = 0
+        for c in sorted(set(self.bwt)):
+            nxt[c] = total
+            total += self.bwt.count(c)
 
-        for i in range(len(self.bwt)):
-            c = self.bwt[i] # Caractere atual da última coluna
-            occ_num = 1 # Vamos contar quantas vezes já vimos este caractere até esta posição
-            for j in range(i):
-                if self.bwt[j] == c:
-                    occ_num += 1 # Incrementamos a contagem de ocorrências anteriores do mesmo caractere
-            pos = self.find_ith_occ(first_col, c, occ_num) # Encontramos a posição correspondente na primeira coluna
-            result.append(pos) # Adicionamos essa posição à lista de mapeamento
+        lf = array('q', bytes(8 * len(self.bwt)))
+        for i, c in enumerate(self.bwt):
+            lf[i] = nxt[c] # A k-ésima ocorrência de c na última coluna é a k-ésima na primeira
+            nxt[c] += 1
+        return lf
 
-        return result
+    def last_to_first(self):
+        """
+        Computes the last-to-first mapping used in backward search.
+        """
+        return self._lf_array().tolist()
 
     def bw_matching(self, pattern):
         """
         Backward search for a pattern using the BWT.
         Returns the list of row indices where the pattern matches.
         """
-        lf = self.last_to_first() # Obtemos o mapeamento "last-to-first" da BWT
-        top = 0  # Índice inicial do intervalo de pesquisa
-        bottom = len(self.bwt) - 1 # Índice final do intervalo de pesquisa
-
-
-        while top <= bottom: # Continuamos enquanto o intervalo for válido
-            if pattern:  # Se ainda houver caracteres no padrão a procurar
-                symbol = pattern[-1] # Vamos verificar o último caractere do padrão
-                pattern = pattern[:-1] # Removemos o último caractere do padrão
-                lmat = [] # Lista com os símbolos da coluna BWT entre top e bottom
-                for i in range(top, bottom + 1):
-                    lmat.append(self.bwt[i]) # Adicionamos cada caractere da BWT dentro do intervalo ao lmat
-
-                if symbol in lmat: # Se o símbolo procurado estiver presente no intervalo atual
-                    top_index = lmat.index(symbol) + top # Primeiro índice onde o símbolo aparece
-                    bottom_index = bottom - lmat[::-1].index(symbol) # Último índice onde o símbolo aparece
-                    top = lf[top_index] # Atualizamos o top usando o mapeamento LF
-                    bottom = lf[bottom_index] # Atualizamos o bottom usando o mapeamento LF
-                else:
-                    return [] # Se o símbolo não for encontrado, o padrão não ocorre — devolvemos lista vazia
-            else:
-                matches = [] # Lista para guardar os índices onde o padrão ocorre
-                for i in range(top, bottom + 1):
-                    matches.append(i) # Adicionamos todos os índices possíveis onde o padrão ocorre
-                return matches
-
-        return [] # Caso o ciclo termine sem encontrar, devolvemos lista vazia
+        top, bottom = self.get_fm_index().backward_search(pattern) # Intervalo de linhas onde o padrão ocorre
+        return list(range(top, bottom))
 
     def bw_matching_pos(self, pattern):
         """
         Returns the positions from the suffix array where the pattern occurs.
         """
-        if not hasattr(self, 'sa'):
+        fm = self.get_fm_index()
+        if not fm.has_sa():
             raise ValueError("Suffix array not built.")
 
-        result = [] #Inicializa a lista
-        matches = self.bw_matching(pattern) # Obtemos as linhas da matriz BWT onde o padrão foi encontrado
-        for m in matches:
-            result.append(self.sa[m]) # Para cada linha correspondente, obtemos a posição original a partir do array de sufixos
+        top, bottom = fm.backward_search(pattern) # Linhas da matriz BWT onde o padrão foi encontrado
+        result = [fm.locate(row) for row in range(top, bottom)] # Posição original de cada linha
         result.sort() # Ordenamos as posições para devolver os resultados por ordem crescente
         return result # Devolvemos a lista de posições onde o padrão ocorre na sequência original
 
-    def show_bwt_matrix(self):
+    def bw_matching_approx(self, pattern, max_mismatches=1):
+        """
+        Returns the sorted list of (position, mismatches) where the pattern
+        occurs with at most max_mismatches substitutions.
+        """
+        fm = self.get_fm_index()
+        if not fm.has_sa():
+            raise ValueError("Suffix array not built.")
+
+        result = []
+        for top, bottom, mismatches in fm.approx_search(pattern, max_mismatches):
+            for row in range(top, bottom):
+                result.append((fm.locate(row), mismatches))
+        result.sort()
+        return result
+
+    def bw_matching_pos_batch(self, patterns, processes=None):
+        """
+        Returns a dict pattern -> positions (as bw_matching_pos) for every pattern.
+        Patterns with common suffixes share backward-search work. If processes
+        is greater than 1 the patterns are split in contiguous chunks (in
+        reversed-suffix order) over a process pool that receives the index once.
+        """
+        fm = self.get_fm_index()
+        if not fm.has_sa():
+            raise ValueError("Suffix array not built.")
+
+        patterns = sorted(set(patterns), key=lambda p: p[::-1]) # Padrões com sufixos comuns ficam juntos
+        if not processes or processes < 2 or len(patterns) < 2:
+            return fm.positions_many(patterns)
+
+        size = -(-len(patterns) // processes) # Divisão arredondada para cima
+        chunks = [patterns[i:i + size] for i in range(0, len(patterns), size)]
+        results = {}
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(fm,)) as executor:
+            for part in executor.map(_positions_worker, chunks):
+                results.update(part)
+        return results
+
+    def iter_rotations(self):
+        """
+        Lazily yields the rows of the BWT matrix (sorted rotations of the original sequence).
+        Raises ValueError if the original sequence is not available (encoded or empty BWT).
+        """
+        if self.encoded or not self.seq:
+            raise ValueError("BWT matrix not available. Build BWT first.")
+        return self._rotations()
+
+    def _rotations(self):
+        text = self.seq
+        sa = self.sa if hasattr(self, 'sa') else suffix_array(text) # Reutiliza o array de sufixos se já existir
+        for i in sa:
+            yield text[i:] + text[:i] # Cada linha só é construída quando é pedida
+
+    def show_bwt_matrix(self, max_rows=None):
         """
         Prints the full BWT matrix (sorted rotations of the original sequence).
+        If max_rows is given, only the first max_rows rows are printed.
         """
-        if hasattr(self, 'rotations'):
-            for row in self.rotations:
-                print(row)
-        else:
-            print("BWT matrix not available. Build BWT first.")
+        try:
+            rows = self.iter_rotations()
+        except ValueError as error:
+            print(error)
+            return
+
+        for count, row in enumerate(rows):
+            if max_rows is not None and count >= max_rows:
+                break
+            print(row)
+
+class MultiSequenceBWT(BWT):
+    """
+    BWT index of several sequences (e.g. the records of a FASTA file).
+
+    Sequences are appended incrementally to a byte buffer, each followed by
+    its own terminator. The terminators are all written as '$' but are
+    ranked as distinct symbols (in record order) when the suffix array is
+    built, so no match can cross two records. bw_matching_pos returns
+    (record_id, offset) pairs.
+    """
+
+    def __init__(self, occ_step=32, sa_sample=1, backend="fm"):
+        super().__init__(occ_step=occ_step, sa_sample=sa_sample, backend=backend)
+        self.record_ids = []
+        self.record_starts = array('q') # Posição de início de cada registo no texto concatenado
+        self._buffer = bytearray()
+
+    @classmethod
+    def from_fasta(cls, path, **kwargs):
+        """
+        Builds the index of every record of a FASTA file, reading it line by line.
+        Record ids are the first word of each header.
+        """
+        index = cls(**kwargs)
+        with open(path) as f:
+            open_record = False
+            for line in f:
+                line = line.strip()
+                if line.startswith(">"):
+                    if open_record:
+                        index._end_record()
+                    header = line[1:].split()
+                    index._start_record(header[0] if header else str(len(index.record_ids)))
+                    open_record = True
+                elif line:
+                    if not open_record: # Sequência sem cabeçalho
+                        index._start_record(str(len(index.record_ids)))
+                        open_record = True
+                    index._append(line)
+            if open_record:
+                index._end_record()
+        index.finish()
+        return index
+
+    @classmethod
+    def from_sequences(cls, sequences, **kwargs):
+        """
+        Builds the index from an iterable of sequences or (record_id, sequence) pairs.
+        """
+        index = cls(**kwargs)
+        for item in sequences:
+            record_id, seq = item if isinstance(item, tuple) else (len(index.record_ids), item)
+            index.add_sequence(record_id, seq)
+        index.finish()
+        return index
+
+    def add_sequence(self, record_id, seq):
+        """
+        Appends a sequence (a str or an iterable of str chunks) as a new record.
+        """
+        self._start_record(record_id)
+        for chunk in ([seq] if isinstance(seq, str) else seq):
+            self._append(chunk)
+        self._end_record()
+
+    def _start_record(self, record_id):
+        if self.bwt:
+            raise ValueError("The index has already been built.")
+        self.record_ids.append(record_id)
+        self.record_starts.append(len(self._buffer))
+
+    def _append(self, chunk):
+        data = chunk.encode("latin-1")
+        if b"$" in data:
+            raise ValueError("Sequences cannot contain '$'.")
+        self._buffer += data
+
+    def _end_record(self):
+        self._buffer += b"$"
+
+    def finish(self):
+        """
+        Builds the BWT, the suffix array samples and the index of the records added so far.
+        """
+        text = self._buffer
+        if not text:
+            return
+        symbols = sorted(set(text))
+        dollar = symbols.index(ord("$"))
+        num_records = len(self.record_ids)
+        code = {s: i if i < dollar else i + num_records - 1 for i, s in enumerate(symbols)} # Abrir espaço para um terminador por registo
+        rank = [code[s] for s in text]
+        for k in range(num_records): # O terminador do registo k fica com o código dollar + k
+            end = self.record_starts[k + 1] if k + 1 < num_records else len(text)
+            rank[end - 1] = dollar + k
+
+        sa = suffix_array(rank)
+        del rank
+        self.bwt = bytes([text[i - 1] for i in sa]).decode("latin-1")
+        self._buffer = bytearray()
+
+        self.fm_index = self._make_index(self.bwt, None)
+        self.fm_index._sample_sa(sa, self.sa_sample, keep=set(self.record_starts)) # Nunca é preciso fazer LF a partir de um '$'
+        if self.backend != "fm":
+            self.bwt = _IndexText(self.fm_index)
+
+    def save(self, path):
+        """
+        Saves the index as BWT.save does and appends the record table
+        (ids and start positions, as JSON) at the end of the file.
+        Record ids must be JSON values (str or int).
+        """
+        super().save(path)
+        table = json.dumps({"ids": self.record_ids, "starts": list(self.record_starts)}).encode("utf-8")
+        with open(path, "ab") as f:
+            f.write(table)
+            f.write(_RECORDS_TRAILER.pack(len(table), _RECORDS_MAGIC))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an index saved with MultiSequenceBWT.save, memory-mapping its FM-index.
+        """
+        fm = FMIndex.load(path)
+        with open(path, "rb") as f:
+            size = f.seek(0, 2)
+            if size < _INDEX_HEADER.size + _RECORDS_TRAILER.size:
+                raise ValueError("Not a multi-sequence index file.")
+            f.seek(size - _RECORDS_TRAILER.size)
+            length, magic = _RECORDS_TRAILER.unpack(f.read(_RECORDS_TRAILER.size))
+            if magic != _RECORDS_MAGIC:
+                raise ValueError("Not a multi-sequence index file.")
+            f.seek(size - _RECORDS_TRAILER.size - length)
+            table = json.loads(f.read(length).decode("utf-8"))
+
+        index = cls(occ_step=fm.step, sa_sample=fm.sa_sample)
+        index.bwt = fm.bwt
+        index.fm_index = fm
+        index.record_ids = table["ids"]
+        index.record_starts = array('q', table["starts"])
+        return index
+
+    def record_of(self, position):
+        """
+        Converts a position of the concatenated text into (record_id, offset).
+        """
+        k = bisect_right(self.record_starts, position) - 1
+        return self.record_ids[k], position - self.record_starts[k]
+
+    def bw_matching_pos(self, pattern):
+        """
+        Returns the sorted list of (record_id, offset) where the pattern occurs.
+        """
+        if "$" in pattern:
+            raise ValueError("Patterns cannot contain '$'.")
+        return [self.record_of(pos) for pos in super().bw_matching_pos(pattern)]
+
+    def bw_matching_approx(self, pattern, max_mismatches=1):
+        """
+        Returns the sorted list of ((record_id, offset), mismatches) where the
+        pattern occurs with at most max_mismatches substitutions.
+        """
+        if "$" in pattern:
+            raise ValueError("Patterns cannot contain '$'.")
+        return [(self.record_of(pos), mismatches)
+                for pos, mismatches in super().bw_matching_approx(pattern, max_mismatches)]
+
+    def bw_matching_pos_batch(self, patterns, processes=None):
+        """
+        Batched bw_matching_pos: returns a dict pattern -> list of (record_id, offset).
+        """
+        if any("$" in p for p in patterns):
+            raise ValueError("Patterns cannot contain '$'.")
+        results = super().bw_matching_pos_batch(patterns, processes)
+        return {p: [self.record_of(pos) for pos in positions] for p, positions in results.items()}
+
+    def inverse_bwt(self):
+        """
+        Reconstructs the concatenated text (records separated by '$').
+        Record k is recovered by walking LF from the row of its terminator
+        until the previous terminator is reached.
+        """
+        fm = self.get_fm_index()
+        records = []
+        for k in range(len(self.record_ids)):
+            row = fm.C["$"] + k # Linha cuja rotação começa pelo terminador k
+            chars = []
+            c = fm.char_at(row)
+            while c != "$":
+                chars.append(c)
+                row = fm.lf(row)
+                c = fm.char_at(row)
+            records.append("".join(reversed(chars)))
+        return "".join(record + "$" for record in records)
+
 
 # 🧪 Test the implementation
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
+import os
+import tempfile
 import unittest
-from BWT import BWT 
+from BWT import BWT, FMIndex, MultiSequenceBWT, PackedFMIndex, RunLengthFMIndex, suffix_array
 
 class TestBWTHardcoded(unittest.TestCase):
 
@@ -14,6 +16,16 @@ class TestBWTHardcoded(unittest.TestCase):
         self.assertEqual(bwt_obj.inverse_bwt(), "abracadabra$")
 
 
+    def test_inverse_bwt_round_trip(self):
+        text = "ACGTTGCAACGTAGGCTTACGATCGATCGGGATC" * 20 + "$"
+        bwt_obj = BWT(BWT(text).bwt, encoded=True)
+        self.assertEqual(bwt_obj.inverse_bwt(), text)
+
+    def test_inverse_bwt_without_terminal(self):
+        bwt_obj = BWT("ardrcaaaabb", encoded=True)
+        with self.assertRaises(ValueError):
+            bwt_obj.inverse_bwt()
+
     def test_find_ith_occ_basic(self):
         # Lista simples com repetições
         bwt_obj = BWT()
@@ -52,6 +64,233 @@ class TestBWTHardcoded(unittest.TestCase):
         positions = bwt_obj.bw_matching_pos("xyz")
         self.assertEqual(positions, [])
 
+    def test_fm_index_c_table_and_rank(self):
+        fm = FMIndex("ard$rcaaaabb", step=4)
+        self.assertEqual(fm.C, {'$': 0, 'a': 1, 'b': 6, 'c': 8, 'd': 9, 'r': 10})
+        for c in fm.alphabet:
+            for i in range(len(fm.bwt) + 1):
+                self.assertEqual(fm.rank(c, i), fm.bwt[:i].count(c))
+        self.assertEqual(fm.rank('z', 5), 0)
+
+    def test_fm_index_lf_matches_last_to_first(self):
+        bwt_obj = BWT("abracadabra$")
+        fm = bwt_obj.get_fm_index()
+        self.assertEqual([fm.lf(i) for i in range(fm.n)], bwt_obj.last_to_first())
+
+    def test_fm_index_built_once(self):
+        bwt_obj = BWT("abracadabra$", buildsufarray=True)
+        bwt_obj.bw_matching("abra")
+        fm = bwt_obj.fm_index
+        bwt_obj.bw_matching("cad")
+        self.assertIs(bwt_obj.fm_index, fm)
+        self.assertEqual(fm.count("a"), 5)
+
+    def test_sampled_sa_positions(self):
+        # Com amostragem o resultado tem de ser igual ao do array completo
+        text = "TAGACAGAGAGACAGATTAGACA$"
+        full = BWT(text, buildsufarray=True)
+        for k in (2, 3, 5, 32):
+            sampled = BWT(text, buildsufarray=True, sa_sample=k)
+            self.assertFalse(hasattr(sampled, 'sa'))
+            for pattern in ["AGA", "A", "GACA", "TT", "CCC", ""]:
+                self.assertEqual(sampled.bw_matching_pos(pattern), full.bw_matching_pos(pattern))
+
+    def test_sampled_sa_keeps_only_samples(self):
+        text = "abracadabra$"
+        fm = FMIndex(BWT(text).bwt, sa=suffix_array(text), sa_sample=4)
+        self.assertEqual(sorted(fm.sa_values), [0, 4, 8])
+        self.assertEqual([fm.locate(row) for row in range(len(text))], suffix_array(text))
+
+    def test_invalid_sa_sample(self):
+        with self.assertRaises(ValueError):
+            FMIndex("ard$rcaaaabb", sa=suffix_array("abracadabra$"), sa_sample=0)
+
+    def test_backward_search_many_matches_single(self):
+        fm = BWT("TAGACAGAGAGACAGATTAGACA$").get_fm_index()
+        patterns = ["AGA", "GAGA", "CAGA", "A", "", "TTT", "XGA", "GACA"]
+        intervals = fm.backward_search_many(patterns)
+        self.assertEqual(set(intervals), set(patterns))
+        for pattern in patterns:
+            self.assertEqual(intervals[pattern], fm.backward_search(pattern))
+
+    def test_bw_matching_pos_batch(self):
+        bwt_obj = BWT("TAGACAGAGAGACAGATTAGACA$", buildsufarray=True, sa_sample=4)
+        patterns = ["AGA", "GAGA", "CAGA", "TT", "CCC", "AGA"]
+        expected = {p: bwt_obj.bw_matching_pos(p) for p in patterns}
+        self.assertEqual(bwt_obj.bw_matching_pos_batch(patterns), expected)
+        self.assertEqual(bwt_obj.bw_matching_pos_batch(patterns, processes=2), expected)
+
+    def test_bw_matching_pos_batch_without_sa(self):
+        bwt_obj = BWT("abracadabra$")
+        with self.assertRaises(ValueError):
+            bwt_obj.bw_matching_pos_batch(["abra"])
+
+    def test_save_and_load_index(self):
+        text = "TAGACAGAGAGACAGATTAGACA$"
+        patterns = ["AGA", "GACA", "TT", "CCC", ""]
+        with tempfile.TemporaryDirectory() as tmp:
+            for k in (1, 4):
+                path = os.path.join(tmp, "index_%d.fm" % k)
+                original = BWT(text, buildsufarray=True, sa_sample=k)
+                original.save(path)
+
+                loaded = BWT.load(path)
+                self.assertEqual(str(loaded.bwt), original.bwt)
+                self.assertEqual(loaded.fm_index.C, original.get_fm_index().C)
+                for pattern in patterns:
+                    self.assertEqual(loaded.bw_matching_pos(pattern), original.bw_matching_pos(pattern))
+                self.assertEqual(loaded.inverse_bwt(), text)
+
+    def test_load_rejects_other_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "not_an_index")
+            with open(path, "wb") as f:
+                f.write(b"ACGT" * 40)
+            with self.assertRaises(ValueError):
+                BWT.load(path)
+
+    def test_mismatch_lower_bounds(self):
+        fm = BWT("abracadabra$").get_fm_index()
+        self.assertEqual(fm.mismatch_lower_bounds("abra"), [0, 0, 0, 0])
+        self.assertEqual(fm.mismatch_lower_bounds("zbzz"), [1, 1, 2, 3])
+
+    def test_bw_matching_approx(self):
+        text = "TAGACAGAGAGACAGATTAGACA$"
+        bwt_obj = BWT(text, buildsufarray=True, sa_sample=3)
+        for pattern in ["AGA", "GACT", "TTTG", "CCCC"]:
+            for k in range(3):
+                expected = []
+                for pos in range(len(text) - len(pattern)):
+                    window = text[pos:pos + len(pattern)]
+                    mismatches = sum(a != b for a, b in zip(window, pattern))
+                    if mismatches <= k:
+                        expected.append((pos, mismatches))
+                self.assertEqual(bwt_obj.bw_matching_approx(pattern, k), expected)
+
+    def test_bw_matching_approx_exact(self):
+        bwt_obj = BWT("abracadabra$", buildsufarray=True)
+        self.assertEqual(bwt_obj.bw_matching_approx("abra", 0), [(0, 0), (7, 0)])
+
+    def test_run_length_index_rank(self):
+        bwt = "aaabbbbaacccc$cc"
+        fm = RunLengthFMIndex(bwt)
+        self.assertEqual(fm.num_runs(), 6)
+        self.assertEqual(fm.C, FMIndex(bwt).C)
+        for c in fm.alphabet + ['z']:
+            for i in range(len(bwt) + 1):
+                self.assertEqual(fm.rank(c, i), bwt[:i].count(c))
+        self.assertEqual([fm.char_at(i) for i in range(len(bwt))], list(bwt))
+
+    def test_run_length_backend(self):
+        text = "ACGTACGTTACGTACGATACGTACGT" * 4 + "$"
+        plain = BWT(text, buildsufarray=True)
+        rle = BWT(text, buildsufarray=True, sa_sample=4, backend="rle")
+        self.assertIsInstance(rle.get_fm_index(), RunLengthFMIndex)
+        self.assertEqual(str(rle.bwt), plain.bwt)
+        self.assertEqual(rle.inverse_bwt(), text)
+        for pattern in ["ACGT", "GTTA", "CGA", "TTT", ""]:
+            self.assertEqual(rle.bw_matching(pattern), plain.bw_matching(pattern))
+            self.assertEqual(rle.bw_matching_pos(pattern), plain.bw_matching_pos(pattern))
+
+    def test_run_length_encoded_input(self):
+        bwt_obj = BWT("ard$rcaaaabb", encoded=True, backend="rle")
+        self.assertEqual(bwt_obj.inverse_bwt(), "abracadabra$")
+        self.assertEqual(len(bwt_obj.bw_matching("abra")), 2)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            BWT("abracadabra$", backend="xyz")
+
+    def test_packed_index_rank(self):
+        bwt = BWT("ACGTTGCAACGTAGGCTTACGATCGATCGGGATCCATGACGTAACGTTTAGCAGT" * 3 + "$").bwt
+        fm = PackedFMIndex(bwt, step=2)
+        self.assertEqual(fm.C, FMIndex(bwt).C)
+        self.assertEqual([fm.char_at(i) for i in range(len(bwt))], list(bwt))
+        for c in "ACGT$N":
+            for i in range(len(bwt) + 1):
+                self.assertEqual(fm.rank(c, i), bwt[:i].count(c))
+
+    def test_packed_backend(self):
+        text = "TAGACAGAGAGACAGATTAGACACCGTAGCTAGCTTAGGATCGA" * 5 + "$"
+        plain = BWT(text, buildsufarray=True)
+        packed = BWT(text, buildsufarray=True, sa_sample=8, backend="packed")
+        self.assertEqual(str(packed.bwt), plain.bwt)
+        self.assertEqual(packed.inverse_bwt(), text)
+        for pattern in ["AGA", "GACA", "TTAGG", "CCC", ""]:
+            self.assertEqual(packed.bw_matching_pos(pattern), plain.bw_matching_pos(pattern))
+        self.assertEqual(packed.bw_matching_approx("TAGGC", 1), plain.bw_matching_approx("TAGGC", 1))
+        # occ_step conta caracteres; o índice compactado guarda checkpoints por palavras de 32 bases
+        sparse = BWT(text, buildsufarray=True, occ_step=128, backend="packed")
+        self.assertEqual(sparse.get_fm_index().step, 4)
+        self.assertEqual(sparse.bw_matching_pos("GACA"), plain.bw_matching_pos("GACA"))
+
+    def test_packed_backend_rejects_non_dna(self):
+        with self.assertRaises(ValueError):
+            BWT("abracadabra$", backend="packed")
+
+    def test_multi_sequence_from_fasta(self):
+        records = {"chr1": "ACGTACGTTAGA", "chr2": "TTAGACCA", "plasmid": "GATTACAGATTACA"}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "assembly.fa")
+            with open(path, "w") as f:
+                for name, seq in records.items():
+                    f.write(">%s description\n%s\n%s\n\n" % (name, seq[:5], seq[5:]))
+            for k in (1, 3):
+                index = MultiSequenceBWT.from_fasta(path, sa_sample=k)
+                self.assertEqual(index.record_ids, list(records))
+                for pattern in ["TTAGA", "ACA", "GATTACA", "A", "CCCC"]:
+                    expected = [(name, i) for name, seq in records.items()
+                                for i in range(len(seq)) if seq.startswith(pattern, i)]
+                    self.assertEqual(index.bw_matching_pos(pattern), expected)
+                self.assertEqual(index.inverse_bwt(), "$".join(records.values()) + "$")
+
+    def test_multi_sequence_no_match_across_records(self):
+        index = MultiSequenceBWT.from_sequences(["AAAC", "GTTT"], sa_sample=2)
+        self.assertEqual(index.bw_matching_pos("CG"), [])
+        self.assertEqual(index.bw_matching_pos("T"), [(1, 1), (1, 2), (1, 3)])
+        self.assertEqual(index.bw_matching_pos_batch(["AC", "GT"]), {"AC": [(0, 2)], "GT": [(1, 0)]})
+        with self.assertRaises(ValueError):
+            index.bw_matching_pos("C$G")
+        self.assertEqual(index.bw_matching_approx("AC", 0), [((0, 2), 0)])
+        self.assertEqual(index.bw_matching_approx("TC", 1), [((0, 2), 1), ((1, 1), 1), ((1, 2), 1)])
+        with self.assertRaises(ValueError):
+            index.bw_matching_approx("C$", 1)
+
+    def test_multi_sequence_chunks_and_backend(self):
+        index = MultiSequenceBWT(backend="rle")
+        index.add_sequence("r1", iter(["ACG", "TAC"]))
+        index.add_sequence("r2", "CGTA")
+        index.finish()
+        self.assertEqual(index.bw_matching_pos("CGTA"), [("r1", 1), ("r2", 0)])
+        self.assertEqual(index.inverse_bwt(), "ACGTAC$CGTA$")
+
+    def test_multi_sequence_packed_backend(self):
+        sequences = ["ACGT", "GGTA", "TTACG"]
+        expected = MultiSequenceBWT.from_sequences(sequences, sa_sample=2)
+        index = MultiSequenceBWT.from_sequences(sequences, sa_sample=2, backend="packed")
+        self.assertEqual(str(index.bwt), expected.bwt)
+        for pattern in ["TA", "ACG", "G", "GTAT"]:
+            self.assertEqual(index.bw_matching_pos(pattern), expected.bw_matching_pos(pattern))
+        self.assertEqual(index.inverse_bwt(), "ACGT$GGTA$TTACG$")
+
+    def test_multi_sequence_save_and_load(self):
+        original = MultiSequenceBWT.from_sequences([("chr1", "ACGTACGT"), ("chr2", "GTACCA"), ("chr3", "TTAC")], sa_sample=3)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "assembly.fmi")
+            original.save(path)
+            loaded = MultiSequenceBWT.load(path)
+            self.assertEqual(loaded.record_ids, ["chr1", "chr2", "chr3"])
+            for pattern in ["TAC", "GT", "A", "CCCC"]:
+                self.assertEqual(loaded.bw_matching_pos(pattern), original.bw_matching_pos(pattern))
+            self.assertEqual(loaded.bw_matching_approx("TAG", 1), original.bw_matching_approx("TAG", 1))
+            self.assertEqual(loaded.inverse_bwt(), "ACGTACGT$GTACCA$TTAC$")
+            del loaded
+            BWT("ACGT$").save(path)
+            with self.assertRaises(ValueError):
+                MultiSequenceBWT.load(path)
+        with self.assertRaises(ValueError):
+            MultiSequenceBWT.from_sequences(["ACGT", "GGTA"], backend="rle").save(os.devnull)
+
     def test_set_bwt_and_inverse_known(self):
         bwt_obj = BWT("s$nnaaa", encoded=True)
         self.assertEqual(bwt_obj.inverse_bwt(), "ananas$")
@@ -74,6 +313,29 @@ class TestBWTHardcoded(unittest.TestCase):
         self.assertEqual(bwt_obj.inverse_bwt(), "$")
         self.assertEqual(bwt_obj.bw_matching(""), [0])  # match vazio
 
+    def test_suffix_array_matches_sorted_rotations(self):
+        # O array de sufixos tem de dar a mesma ordem que ordenar as rotações
+        for text in ["abracadabra$", "TAGACAGAGA$", "ACGTTGCAACGTTGCA$", "AAAAAAA$"]:
+            rotations = sorted(range(len(text)), key=lambda i: text[i:] + text[:i])
+            self.assertEqual(suffix_array(text), rotations)
+
+    def test_build_bwt_without_rotations(self):
+        # A matriz de rotações não deve ser guardada
+        bwt_obj = BWT("abracadabra$", buildsufarray=True)
+        self.assertFalse(hasattr(bwt_obj, 'rotations'))
+        self.assertEqual(bwt_obj.sa, [11, 10, 7, 0, 3, 5, 8, 1, 4, 6, 9, 2])
+
+    def test_iter_rotations(self):
+        bwt_obj = BWT("abracadabra$")
+        rows = list(bwt_obj.iter_rotations())
+        self.assertEqual(rows, sorted(rows))
+        self.assertEqual("".join(row[-1] for row in rows), bwt_obj.bwt)
+        # Sem a sequência original não há rotações para gerar
+        with self.assertRaises(ValueError):
+            BWT("AGGGTCAAAA$", encoded=True).iter_rotations()
+        with self.assertRaises(ValueError):
+            BWT().iter_rotations()
+
     def test_show_bwt_matrix_runs(self):
         # Verifica se a função corre sem erro
         bwt_obj = BWT("abracadabra$", buildsufarray=True)
@@ -0,0 +1,279 @@
+"""
+Benchmark of the exact pattern search engines of the repository:
+Automata.find_matches, BWT.bw_matching_pos and SuffixTree.encontra_padrao.
+
+For every engine, text kind (random or repetitive DNA) and size it reports the
+index build time, the per-query latency percentiles and the peak memory traced
+with tracemalloc (of the build, plus the queries for the automaton, which has no
+index). Every other engine's answers are checked against the automaton (marked
+"ref"), so the script also catches correctness regressions.
+
+Example:
+    python Benchmarks/benchmark_pattern_search.py --sizes 1k 10k 100k 1M 10M --queries 200
+"""
+import argparse
+import importlib
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Largest text each engine is run on by default: the suffix tree stores every
+# suffix explicitly (quadratic memory) and the suffix array build is O(n log n)
+# in pure Python.
+DEFAULT_CAPS = {"automata": 10_000_000, "bwt": 10_000_000, "suffixtree": 1_000}
+
+
+def load_module(directory, name):
+    """
+    Imports a module of the repository, hiding the examples it prints at import time.
+    """
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    with redirect_stdout(io.StringIO()):
+        return importlib.import_module(name)
+
+
+def parse_size(text):
+    """
+    Parses sizes such as 1000, 10k or 1M (decimal multipliers).
+    """
+    multipliers = {"k": 10 ** 3, "m": 10 ** 6, "g": 10 ** 9}
+    text = text.strip().lower().rstrip("b")
+    if text and text[-1] in multipliers:
+        return int(float(text[:-1]) * multipliers[text[-1]])
+    return int(text)
+
+
+def format_size(n):
+    for unit, value in (("M", 10 ** 6), ("k", 10 ** 3)):
+        if n >= value and n % value == 0:
+            return "%d%s" % (n // value, unit)
+    return str(n)
+
+
+def random_dna(n, rng):
+    return "".join(rng.choices("ACGT", k=n))
+
+
+def repetitive_dna(n, rng, unit=500, mutation_rate=0.01):
+    """
+    Copies of one random unit with a small rate of point mutations, as in
+    tandem repeats: many long shared substrings and many occurrences per query.
+    """
+    base = random_dna(unit, rng)
+    copies = []
+    for _ in range(n // unit + 1):
+        copy = list(base)
+        for i in range(unit):
+            if rng.random() < mutation_rate:
+                copy[i] = rng.choice("ACGT")
+        copies.append("".join(copy))
+    return "".join(copies)[:n]
+
+
+def make_queries(text, count, length, rng):
+    """
+    Half of the queries are substrings of the text, half are random (usually absent).
+    """
+    queries = []
+    for i in range(count):
+        if i % 2 == 0 and len(text) >= length:
+            start = rng.randrange(len(text) - length + 1)
+            queries.append(text[start:start + length])
+        else:
+            queries.append(random_dna(length, rng))
+    return queries
+
+
+# Each engine wraps one search engine behind build(text) -> index and
+# query(index, pattern) -> sorted positions.
+
+class AutomataEngine:
+    """
+    The automaton has no text index: each query compiles the pattern (without the
+    cache, so that repeated queries are not free) and scans the whole text, so its
+    memory is traced over the queries.
+    """
+
+    name = "automata"
+    trace_queries = True
+
+    def __init__(self):
+        self.Automata = load_module("Automatos_finitos", "AF").Automata
+
+    def build(self, text):
+        return text
+
+    def query(self, index, pattern):
+        return self.Automata(pattern, cache=False).find_matches(index)
+
+
+class BWTEngine:
+    name = "bwt"
+    trace_queries = False
+
+    def __init__(self, sa_sample=32):
+        self.BWT = load_module("BWT", "BWT").BWT
+        self.sa_sample = sa_sample
+
+    def build(self, text):
+        index = self.BWT(text + "$", buildsufarray=True, sa_sample=self.sa_sample)
+        index.get_fm_index()
+        return index
+
+    def query(self, index, pattern):
+        return index.bw_matching_pos(pattern)
+
+
+class SuffixTreeEngine:
+    name = "suffixtree"
+    trace_queries = False
+
+    def __init__(self):
+        self.SuffixTree = load_module("tries_e_suffix_tree", "suffix_tree").SuffixTree
+
+    def build(self, text):
+        tree = self.SuffixTree()
+        tree.inserir_palavra(text)
+        return tree
+
+    def query(self, index, pattern):
+        # Each occurrence comes wrapped in its terminal node, {'$': (word_index, offset)}
+        return sorted(leaf["$"][1] for leaf in index.encontra_padrao(pattern))
+
+
+ENGINES = {"automata": AutomataEngine, "bwt": BWTEngine, "suffixtree": SuffixTreeEngine}
+
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return float("nan")
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def run_case(engine, text, queries, expected, measure_memory=True):
+    """
+    Builds the engine's index for one text and times every query.
+    Answers are compared with expected unless it is None (the reference engine).
+    Returns a dict with the measurements.
+    """
+    start = time.perf_counter()
+    index = engine.build(text)
+    build_time = time.perf_counter() - start
+
+    latencies = []
+    mismatches = 0
+    for i, pattern in enumerate(queries):
+        start = time.perf_counter()
+        result = engine.query(index, pattern)
+        latencies.append(time.perf_counter() - start)
+        if expected is not None and result != expected[i]:
+            mismatches += 1
+    del index
+
+    peak = None
+    if measure_memory: # Separate build, so that tracing does not inflate the build time
+        tracemalloc.start()
+        index = engine.build(text)
+        if engine.trace_queries: # Without an index the work (and the memory) is in the queries
+            for pattern in queries:
+                engine.query(index, pattern)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del index
+
+    latencies.sort()
+    return {
+        "build_s": build_time,
+        "query_p50_ms": percentile(latencies, 0.50) * 1e3,
+        "query_p90_ms": percentile(latencies, 0.90) * 1e3,
+        "query_p99_ms": percentile(latencies, 0.99) * 1e3,
+        "query_max_ms": latencies[-1] * 1e3 if latencies else float("nan"),
+        "peak_mb": peak / 2 ** 20 if peak is not None else None,
+        "mismatches": mismatches if expected is not None else None,
+    }
+
+
+def parse_caps(items):
+    caps = dict(DEFAULT_CAPS)
+    for item in items or ():
+        name, _, size = item.partition("=")
+        if name not in ENGINES or not size:
+            raise ValueError("--max-size expects ENGINE=SIZE, got %r" % item)
+        caps[name] = parse_size(size)
+    return caps
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES), default=sorted(ENGINES))
+    parser.add_argument("--kinds", nargs="+", choices=("random", "repetitive"), default=["random", "repetitive"])
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[1_000, 10_000, 100_000, 1_000_000],
+                        help="text sizes, e.g. 1k 100k 10M")
+    parser.add_argument("--queries", type=int, default=100, help="queries per text")
+    parser.add_argument("--pattern-length", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--max-size", nargs="*", metavar="ENGINE=SIZE",
+                        help="override the largest text per engine (defaults: %s)"
+                        % ", ".join("%s=%s" % (k, format_size(v)) for k, v in sorted(DEFAULT_CAPS.items())))
+    parser.add_argument("--bwt-sa-sample", type=int, default=32, help="suffix array sampling rate of the BWT")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced build (peak memory)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to a JSON file")
+    args = parser.parse_args(argv)
+
+    try:
+        caps = parse_caps(args.max_size)
+    except ValueError as error:
+        parser.error(str(error))
+    engines = []
+    for name in args.engines:
+        engines.append(BWTEngine(args.bwt_sa_sample) if name == "bwt" else ENGINES[name]())
+    reference = AutomataEngine()
+
+    header = "%-10s %-10s %6s %10s %10s %10s %10s %10s %10s %5s" % (
+        "engine", "text", "size", "build(s)", "p50(ms)", "p90(ms)", "p99(ms)", "max(ms)", "peak(MB)", "bad")
+    print(header)
+    print("-" * len(header))
+
+    results = []
+    for kind in args.kinds:
+        for size in args.sizes:
+            rng = random.Random("%d-%s-%d" % (args.seed, kind, size)) # Same data on every run
+            text = random_dna(size, rng) if kind == "random" else repetitive_dna(size, rng)
+            queries = make_queries(text, args.queries, args.pattern_length, rng)
+            expected = [reference.query(text, pattern) for pattern in queries]
+            for engine in engines:
+                if size > caps[engine.name]:
+                    print("%-10s %-10s %6s %s" % (engine.name, kind, format_size(size), "skipped (--max-size)"))
+                    continue
+                is_reference = engine.name == reference.name
+                row = run_case(engine, text, queries, None if is_reference else expected, not args.no_memory)
+                row.update(engine=engine.name, text=kind, size=size, queries=len(queries))
+                results.append(row)
+                print("%-10s %-10s %6s %10.3f %10.3f %10.3f %10.3f %10.3f %10s %5s" % (
+                    engine.name, kind, format_size(size), row["build_s"], row["query_p50_ms"],
+                    row["query_p90_ms"], row["query_p99_ms"], row["query_max_ms"],
+                    "-" if row["peak_mb"] is None else "%.3f" % row["peak_mb"],
+                    "ref" if is_reference else row["mismatches"]))
+                sys.stdout.flush()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+    return 1 if any(row["mismatches"] for row in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
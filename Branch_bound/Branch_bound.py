@@ -1,3 +1,9 @@
+from concurrent.futures import ProcessPoolExecutor
+from heapq import merge
+from itertools import groupby, islice, product
+from multiprocessing import Value
+
+
 def score(seqs, offsets, tam_motif):
     """
     Calcula o score de uma configuração de offsets para encontrar o melhor motif.
@@ -19,18 +25,23 @@ def score(seqs, offsets, tam_motif):
     return sum(max(col.count(x) for x in set(col)) for col in zip(*snips))
 
 
-def branch_and_bound(seqs, num_seqs, tam_seq, tam_motif):
+def branch_and_bound(seqs, num_seqs, tam_seq, tam_motif, processos=1, profundidade=1, max_empates=None):
     """
     Algoritmo Branch and Bound para encontrar os melhores conjuntos de offsets.
     
-    Explora recursivamente diferentes combinações de offsets e usa poda para eliminar ramos que não podem
-    superar o melhor score encontrado.
+    Explora diferentes combinações de offsets (em profundidade, com uma pilha explícita) e usa poda para
+    eliminar ramos que não podem superar o melhor score encontrado.
     
     Parâmetros:
     seqs (list of str): Lista de sequências de DNA.
     num_seqs (int): Número de sequências.
     tam_seq (int): Tamanho de cada sequência.
     tam_motif (int): Tamanho do motivo a ser identificado.
+    processos (int): Com mais de 1, a árvore é partida nos offsets das primeiras `profundidade` sequências
+        e as subárvores são exploradas num conjunto de processos que partilham o melhor score.
+    profundidade (int): Número de sequências cujos offsets definem as tarefas do modo paralelo.
+    max_empates (int ou None): Se for dado, só são guardados os primeiros max_empates conjuntos de offsets
+        ótimos (pela ordem da pesquisa), e os ramos que só dariam mais empates deixam de ser explorados.
     
     Retorna:
     tuple: (
@@ -38,9 +49,173 @@ def branch_and_bound(seqs, num_seqs, tam_seq, tam_motif):
         melhor_score (int): Melhor score obtido.
     )
     """
-    melhor_score = 0
-    melhores_offsets = []
+    janelas, num_bases = _prepara(seqs, num_seqs, tam_seq, tam_motif)
+    if profundidade < 1:
+        raise ValueError('A profundidade tem que ser pelo menos 1.')
+    if max_empates is not None and max_empates < 1:
+        raise ValueError('max_empates tem que ser pelo menos 1.')
+    limite = tam_seq - tam_motif + 1
+
+    # otimo[k]: melhor score das sequências k, k+1, ... sozinhas (otimo[num_seqs] = 0). Como o máximo
+    # de uma coluna é subaditivo, score_parcial + otimo[idx] é um limite superior admissível do score
+    # de qualquer alinhamento que complete o atual, muito mais justo do que tam_motif * (num_seqs - idx).
+    otimo = [0] * (num_seqs + 1)
+
+    pool = partilhado = None
+    if processos > 1:
+        partilhado = Value('i', 0)
+        pool = ProcessPoolExecutor(processos, initializer=_init_worker,
+                                   initargs=(janelas, num_bases, tam_motif, partilhado))
+
+    def resolve(inicio, empates, melhor_score):
+        if pool is None or num_seqs - inicio <= profundidade:
+            return _executa(_explora(janelas, num_bases, tam_motif, otimo, inicio, [()], empates, melhor_score,
+                                     max_empates=max_empates))
+
+        # Tarefas: blocos consecutivos de prefixos, para os resultados juntos ficarem pela ordem da pesquisa sequencial
+        prefixos = list(product(range(limite), repeat=profundidade))
+        tamanho = max(1, len(prefixos) // (processos * 8))
+        tarefas = [(otimo, inicio, prefixos[i : i + tamanho], empates, melhor_score, max_empates)
+                   for i in range(0, len(prefixos), tamanho)]
+        partilhado.value = melhor_score
+        resultados = list(pool.map(_explora_tarefa, tarefas))
+
+        melhor_score = max(melhor for _, melhor in resultados)
+        melhores_offsets = [offsets for melhores, melhor in resultados if melhor == melhor_score for offsets in melhores]
+        return melhores_offsets[:max_empates], melhor_score
+
+    try:
+        # Calcula otimo de trás para a frente; cada subproblema usa os limites dos mais pequenos
+        # e começa do ótimo do anterior (juntar uma sequência nunca baixa o score).
+        for inicio in range(num_seqs - 1, 0, -1):
+            otimo[inicio] = resolve(inicio, False, otimo[inicio + 1])[1]
+
+        return resolve(0, True, 0)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def branch_and_bound_iter(seqs, num_seqs, tam_seq, tam_motif):
+    """
+    Versão geradora de branch_and_bound: devolve (offsets, score) sempre que a pesquisa encontra uma
+    solução melhor do que as anteriores. A última é ótima; os empates não são devolvidos.
+    """
+    janelas, num_bases = _prepara(seqs, num_seqs, tam_seq, tam_motif)
+    otimo = [0] * (num_seqs + 1)
+    for inicio in range(num_seqs - 1, 0, -1):
+        otimo[inicio] = _executa(_explora(janelas, num_bases, tam_motif, otimo, inicio, [()], False, otimo[inicio + 1]))[1]
+    yield from _explora(janelas, num_bases, tam_motif, otimo, 0, [()], True, 0, max_empates=1)
+
+
+def median_string(seqs, num_seqs, tam_seq, tam_motif, max_empates=None):
+    """
+    Alternativa a branch_and_bound que pesquisa sobre os motifs em vez dos offsets (problema da median string).
+
+    Para um motif m, d(m) é a soma, em todas as sequências, da menor distância de Hamming entre m e uma janela.
+    Como o score de um alinhamento é tam_motif * num_seqs menos a distância ao seu consenso, o melhor score é
+    tam_motif * num_seqs - min d(m), e os alinhamentos ótimos são as janelas mais próximas de cada motif ótimo.
+    Os motifs são enumerados por ordem de uma trie, com poda pela distância do prefixo (que nunca desce ao
+    acrescentar letras). As distâncias a todas as janelas de uma sequência são contadas de uma vez, com
+    contadores bit-sliced em inteiros (um bit por janela). Compensa para motifs curtos (até ~12 bases) e
+    muitas sequências, em que |alfabeto|^tam_motif é muito menor do que (tam_seq - tam_motif + 1)^num_seqs.
+
+    Parâmetros e retorno como em branch_and_bound: (melhores_offsets, melhor_score), com os conjuntos de
+    offsets ótimos pela mesma ordem (max_empates limita quantos são devolvidos).
+    """
+    _valida(seqs)
+    if max_empates is not None and max_empates < 1:
+        raise ValueError('max_empates tem que ser pelo menos 1.')
+    limite = tam_seq - tam_motif + 1
+    seqs = seqs[:num_seqs]
+    if not seqs:
+        return [[]], 0
+    if limite <= 0:
+        return [], 0
+
+    alfabeto = sorted(set().union(*seqs))  # Maiúsculas e minúsculas são bases diferentes, como em score
+    todas = (1 << limite) - 1
+    # posicoes[i][c]: bit p ligado se seqs[i][p] == c; (posicoes[i][c] >> j) & todas são as janelas com c na coluna j
+    posicoes = []
+    for seq in seqs:
+        bits = dict.fromkeys(alfabeto, 0)
+        for p, base in enumerate(seq):
+            bits[base] |= 1 << p
+        posicoes.append(bits)
+
+    melhor_distancia = tam_motif * len(seqs) + 1
+    otimos = []  # (motif, janelas mais próximas de cada sequência) dos motifs ótimos
+
+    def minimo(planos):
+        """Menor contador bit-sliced e a máscara das janelas que o atingem."""
+        janelas, valor = todas, 0
+        for b in range(len(planos) - 1, -1, -1):
+            sem_bit = janelas & ~planos[b]
+            if sem_bit:
+                janelas = sem_bit
+            else:
+                valor |= 1 << b
+        return valor, janelas
+
+    def rec(motif, contadores):
+        """contadores[i]: planos de bits do número de diferenças entre o motif e cada janela da sequência i."""
+        nonlocal melhor_distancia, otimos
+        j = len(motif)
+        for c in alfabeto:
+            novos = []
+            distancia = 0
+            for bits, planos in zip(posicoes, contadores):
+                transporte = todas & ~(bits[c] >> j)  # Janelas com uma diferença na coluna j
+                planos = list(planos)
+                for b in range(len(planos)):
+                    planos[b], transporte = planos[b] ^ transporte, planos[b] & transporte
+                    if not transporte:
+                        break
+                if transporte:
+                    planos.append(transporte)
+                novos.append(planos)
+                distancia += minimo(planos)[0]
+                if distancia > melhor_distancia:  # Os empates continuam a ser explorados
+                    break
+            else:
+                motif.append(c)
+                if j + 1 < tam_motif:
+                    rec(motif, novos)
+                else:
+                    if distancia < melhor_distancia:
+                        melhor_distancia = distancia
+                        otimos = []
+                    otimos.append((motif.copy(), [minimo(planos)[1] for planos in novos]))
+                motif.pop()
 
+    rec([], [[] for _ in seqs])
+
+    # Cada product já sai por ordem lexicográfica: junta-os sem os gerar todos e para em max_empates
+    produtos = [product(*[[p for p in range(limite) if janelas_i >> p & 1] for janelas_i in janelas])
+                for _, janelas in otimos]
+    distintos = (offsets for offsets, _ in groupby(merge(*produtos)))  # O mesmo alinhamento pode vir de vários motifs
+    melhores_offsets = [list(offsets) for offsets in islice(distintos, max_empates)]
+    return melhores_offsets, tam_motif * len(seqs) - melhor_distancia
+
+
+def _prepara(seqs, num_seqs, tam_seq, tam_motif):
+    """
+    Valida as sequências e devolve (janelas, num_bases): janelas[i][p] são os códigos inteiros do snip
+    da sequência i no offset p (maiúsculas e minúsculas são bases diferentes, como em score).
+    """
+    _valida(seqs)
+
+    codigos = {}
+    for seq in seqs:
+        for base in seq:
+            codigos.setdefault(base, len(codigos))
+    limite = tam_seq - tam_motif + 1
+    janelas = [[tuple(codigos[base] for base in seq[p : p + tam_motif]) for p in range(limite)] for seq in seqs[:num_seqs]]
+    return janelas, len(codigos)
+
+
+def _valida(seqs):
+    """Verifica que as sequências só têm bases de DNA e que têm todas o mesmo tamanho."""
     # Dicionário de bases de DNA válidas
     bases_validas = {'A', 'C', 'G', 'T', 'a', 'c', 'g', 't'}
 
@@ -52,35 +227,164 @@ def branch_and_bound(seqs, num_seqs, tam_seq, tam_motif):
 
     assert all(len(seq) == len(seqs[0]) for seq in seqs), 'As sequências têm que ter o mesmo tamanho!'
 
-    def rec(offsets):
-        nonlocal melhor_score, melhores_offsets
-        idx = len(offsets)  # Número de offsets já definidos
 
-        if idx == num_seqs:
-            score_atual = score(seqs, offsets, tam_motif)
-            if score_atual > melhor_score:
-                melhor_score = score_atual
-                melhores_offsets = [offsets.copy()]
-            elif score_atual == melhor_score:
-                melhores_offsets.append(offsets.copy())
-            return
+def _executa(pesquisa):
+    """Corre um gerador _explora até ao fim e devolve o seu resultado."""
+    while True:
+        try:
+            next(pesquisa)
+        except StopIteration as fim:
+            return fim.value
+
 
-        score_parcial = score(seqs, offsets, tam_motif)
-        melhor_score_teorico = score_parcial + tam_motif * (num_seqs - idx)
+def _explora(janelas, num_bases, tam_motif, otimo, inicio, prefixos, empates, melhor_score, partilhado=None,
+             max_empates=None):
+    """
+    Pesquisa branch and bound nos offsets das sequências inicio, inicio + 1, ... abaixo de cada um dos
+    prefixos dados (offsets já fixados das primeiras sequências), pela ordem dada.
 
-        if melhor_score_teorico < melhor_score:
-            return
+    A árvore é percorrida em profundidade com uma pilha explícita. Com empates=False só interessa o valor
+    do melhor score, e os ramos que apenas o igualam são podados; o mesmo acontece quando já há max_empates
+    soluções ótimas guardadas. partilhado (multiprocessing.Value) é o melhor score conhecido por todos os
+    processos.
 
-        limite = tam_seq - tam_motif + 1
-        for offset in range(limite):
+    É um gerador que devolve (offsets, score) sempre que o melhor score sobe, e que retorna
+    (melhores_offsets, melhor_score), só com os alinhamentos deste conjunto de prefixos.
+    """
+    num_seqs = len(janelas)
+    ultima = num_seqs - 1
+    melhores_offsets = []
+
+    # Contagens por coluna do alinhamento parcial, máximo de cada coluna e a sua soma (o score parcial)
+    contagens = [[0] * num_bases for _ in range(tam_motif)]
+    maximos = [0] * tam_motif
+    score_parcial = 0
+    # topo: bit j * num_bases + c ligado se a base c é (uma das) mais frequentes da coluna j. Com a máscara
+    # de uma janela (os bits das suas bases), o score depois de a juntar é score_parcial + popcount(topo & máscara).
+    colunas = [((1 << num_bases) - 1) << (j * num_bases) for j in range(tam_motif)]
+    topo = sum(colunas)
+    mascaras = [[sum(1 << (j * num_bases + c) for j, c in enumerate(janela)) for janela in js] for js in janelas]
+
+    def adiciona(janela):
+        """Junta um snip ao alinhamento em O(L) e devolve o que é preciso para o desfazer."""
+        nonlocal score_parcial, topo
+        anterior = topo
+        subiram = []
+        for j, c in enumerate(janela):
+            contagem = contagens[j][c] + 1
+            contagens[j][c] = contagem
+            if contagem > maximos[j]:  # Cada contagem só sobe 1, logo o máximo também
+                maximos[j] = contagem
+                subiram.append(j)
+                topo = topo & ~colunas[j] | 1 << (j * num_bases + c)
+            elif contagem == maximos[j]:
+                topo |= 1 << (j * num_bases + c)
+        score_parcial += len(subiram)
+        return janela, subiram, anterior
+
+    def remove(janela, subiram, anterior):
+        """Desfaz adiciona(janela)."""
+        nonlocal score_parcial, topo
+        for j, c in enumerate(janela):
+            contagens[j][c] -= 1
+        for j in subiram:
+            maximos[j] -= 1
+        score_parcial -= len(subiram)
+        topo = anterior
+
+    # folga é 1 enquanto se guardam empates (só se poda abaixo do melhor score) e 0 depois
+    folga = 1 if empates else 0
+
+    def regista(offsets, score_atual):
+        """Regista uma folha que chegou (pelo menos) ao melhor score. Retorna True se o melhor score subiu."""
+        nonlocal melhor_score, melhores_offsets, folga
+        subiu = score_atual > melhor_score
+        if subiu:
+            melhor_score = score_atual
+            melhores_offsets = [offsets]
+            folga = 1 if empates else 0  # Os empates do novo melhor score voltam a ser guardados
+            if partilhado is not None:
+                with partilhado.get_lock():
+                    if score_atual > partilhado.value:
+                        partilhado.value = score_atual
+        else:
+            melhores_offsets.append(offsets)
+        if max_empates is not None and len(melhores_offsets) >= max_empates:
+            folga = 0
+        return subiu
+
+    for prefixo in prefixos:
+        # Junta as janelas do prefixo, com o mesmo teste de poda de cada nível da pesquisa
+        pilha = []  # O que adiciona devolveu para cada offset escolhido (para o desfazer)
+        offsets = []
+        for idx, offset in enumerate(prefixo, inicio):
+            janela = janelas[idx][offset]
+            score_atual = score_parcial + (topo & mascaras[idx][offset]).bit_count()
+            if score_atual + otimo[idx + 1] + folga <= melhor_score:
+                break
+            if idx == ultima:
+                if regista(offsets + [offset], score_atual):
+                    yield offsets + [offset], score_atual
+                break
+            pilha.append(adiciona(janela))
             offsets.append(offset)
-            rec(offsets)
-            offsets.pop()
+        else:
+            if inicio + len(prefixo) == num_seqs:  # Só acontece sem sequências
+                if score_parcial == melhor_score:
+                    melhores_offsets.append(offsets.copy())
+            else:
+                # Pesquisa em profundidade abaixo do prefixo, com um iterador de (offset, janela) por nível
+                base = len(offsets)
+                idx = inicio + base  # Sequência cujo offset vai ser escolhido
+                iteradores = [enumerate(zip(janelas[idx], mascaras[idx]))]
+                while iteradores:
+                    for offset, (janela, mascara) in iteradores[-1]:
+                        score_atual = score_parcial + (topo & mascara).bit_count()
+                        # Bypass: o filho e toda a sua subárvore são saltados quando o limite não chega ao melhor score
+                        if score_atual + otimo[idx + 1] + folga <= melhor_score:
+                            continue
+                        if idx == ultima:
+                            if regista(offsets + [offset], score_atual):
+                                yield offsets + [offset], score_atual
+                            continue
+                        # Desce para o filho; o ciclo deste nível continua quando a subárvore acabar
+                        pilha.append(adiciona(janela))
+                        offsets.append(offset)
+                        idx += 1
+                        iteradores.append(enumerate(zip(janelas[idx], mascaras[idx])))
+                        if partilhado is not None and partilhado.value > melhor_score:
+                            melhor_score = partilhado.value  # Outro processo já encontrou melhor
+                            melhores_offsets = []
+                            folga = 1 if empates else 0
+                        break
+                    else:  # Nível esgotado: volta ao anterior
+                        iteradores.pop()
+                        if len(offsets) > base:
+                            offsets.pop()
+                            remove(*pilha.pop())
+                        idx -= 1
+        while pilha:
+            remove(*pilha.pop())
 
-    rec([])
     return melhores_offsets, melhor_score
 
 
+# Dados partilhados pelas tarefas de cada processo (definidos por _init_worker)
+_worker_dados = None
+
+
+def _init_worker(janelas, num_bases, tam_motif, partilhado):
+    global _worker_dados
+    _worker_dados = (janelas, num_bases, tam_motif, partilhado)
+
+
+def _explora_tarefa(tarefa):
+    janelas, num_bases, tam_motif, partilhado = _worker_dados
+    otimo, inicio, prefixos, empates, melhor_score, max_empates = tarefa
+    return _executa(_explora(janelas, num_bases, tam_motif, otimo, inicio, prefixos, empates, melhor_score,
+                             partilhado, max_empates))
+
+
 def mostra_motifs(resultado):
     """
     Exibe os melhores conjuntos de offsets e os motifs correspondentes.
@@ -1,3 +1,5 @@
+import itertools
+import random
 import unittest
 
 from Branch_bound import *
@@ -74,6 +76,138 @@ class TestBNB(unittest.TestCase) :
         self.assertEqual(branch_and_bound(seqs, num_seqs, tam_seqs, tam_motif), ([[0, 0, 0, 8], [0, 0, 8, 8]], 15))
 
 
+#Compara com a pesquisa exaustiva usando a função score (mesmos empates, pela mesma ordem)
+    def test_bnb_exaustivo(self):
+        random.seed(7)
+        for _ in range(40):
+            num_seqs = random.randint(1, 4)
+            tam_seqs = random.randint(1, 7)
+            tam_motif = random.randint(1, tam_seqs)
+            seqs = ["".join(random.choice("ACGTa") for _ in range(tam_seqs)) for _ in range(num_seqs)]
+            todos = [list(o) for o in itertools.product(range(tam_seqs - tam_motif + 1), repeat=num_seqs)]
+            melhor = max(score(seqs, o, tam_motif) for o in todos)
+            esperado = ([o for o in todos if score(seqs, o, tam_motif) == melhor], melhor)
+            with self.subTest(seqs=seqs, tam_motif=tam_motif):
+                self.assertEqual(branch_and_bound(seqs, num_seqs, tam_seqs, tam_motif), esperado)
+
+#Com 10 sequências e um motif plantado (o limite das sequências restantes torna a pesquisa rápida)
+    def test_bnb_motif_plantado(self):
+        random.seed(3)
+        motif = "GATTACA"
+        posicoes = [random.randrange(14) for _ in range(10)]
+        seqs = []
+        for p in posicoes:
+            seq = [random.choice("ACGT") for _ in range(20)]
+            seq[p : p + len(motif)] = motif
+            seqs.append("".join(seq))
+        melhores, melhor = branch_and_bound(seqs, len(seqs), 20, len(motif))
+        self.assertEqual(melhor, 70)
+        self.assertIn(posicoes, melhores)
+
+#O modo paralelo tem que dar o mesmo resultado, com os empates pela mesma ordem
+    def test_bnb_paralelo(self):
+        casos = [("ACTGACTAGTTATA ACTGCGATAGATTG AATGATCTAGTGCA CATGCTGCACTGCA".split(), 4),
+                 ("ATGGTCGC TTGTCTGA CCGTAGTA".split(), 3)]
+        for seqs, tam_motif in casos:
+            esperado = branch_and_bound(seqs, len(seqs), len(seqs[0]), tam_motif)
+            for profundidade in (1, 2):
+                with self.subTest(seqs=seqs, profundidade=profundidade):
+                    self.assertEqual(branch_and_bound(seqs, len(seqs), len(seqs[0]), tam_motif,
+                                                      processos=2, profundidade=profundidade), esperado)
+        with self.assertRaises(ValueError):
+            branch_and_bound(["ACGT", "ACGT"], 2, 4, 2, processos=2, profundidade=0)
+
+#Só os primeiros max_empates ótimos são guardados, pela ordem da pesquisa
+    def test_bnb_max_empates(self):
+        seqs = ["A" * 12] * 4  # Todos os 10^4 conjuntos de offsets são ótimos
+        self.assertEqual(branch_and_bound(seqs, 4, 12, 3, max_empates=3),
+                         ([[0, 0, 0, 0], [0, 0, 0, 1], [0, 0, 0, 2]], 12))
+        self.assertEqual(len(branch_and_bound(seqs, 4, 12, 3)[0]), 10 ** 4)
+        seqs = "ACTGACTAGTTATA ACTGCGATAGATTG AATGATCTAGTGCA CATGCTGCACTGCA".split()
+        self.assertEqual(branch_and_bound(seqs, 4, 14, 4, max_empates=1), ([[0, 0, 0, 8]], 15))
+        self.assertEqual(branch_and_bound(seqs, 4, 14, 4, processos=2, max_empates=1), ([[0, 0, 0, 8]], 15))
+        with self.assertRaises(ValueError):
+            branch_and_bound(seqs, 4, 14, 4, max_empates=0)
+        self.assertEqual(branch_and_bound(['CCC', 'ACA', 'AAC', 'CCA'], 4, 3, 1, max_empates=2),
+                         ([[0, 1, 2, 0], [0, 1, 2, 1]], 4))
+        random.seed(13)
+        for _ in range(40):
+            num_seqs = random.randint(1, 4)
+            tam_seqs = random.randint(1, 7)
+            tam_motif = random.randint(1, tam_seqs)
+            seqs = ["".join(random.choice("ACGT") for _ in range(tam_seqs)) for _ in range(num_seqs)]
+            todos, melhor = branch_and_bound(seqs, num_seqs, tam_seqs, tam_motif)
+            for max_empates in (2, 3):
+                with self.subTest(seqs=seqs, tam_motif=tam_motif, max_empates=max_empates):
+                    self.assertEqual(branch_and_bound(seqs, num_seqs, tam_seqs, tam_motif, max_empates=max_empates),
+                                     (todos[:max_empates], melhor))
+        for _ in range(8):
+            num_seqs = random.randint(2, 4)
+            tam_seqs = random.randint(2, 7)
+            tam_motif = random.randint(1, tam_seqs)
+            seqs = ["".join(random.choice("ACGT") for _ in range(tam_seqs)) for _ in range(num_seqs)]
+            todos, melhor = branch_and_bound(seqs, num_seqs, tam_seqs, tam_motif)
+            for max_empates in (2, 3):
+                with self.subTest(seqs=seqs, tam_motif=tam_motif, max_empates=max_empates, processos=2):
+                    self.assertEqual(branch_and_bound(seqs, num_seqs, tam_seqs, tam_motif, processos=2,
+                                                      max_empates=max_empates), (todos[:max_empates], melhor))
+
+#O gerador devolve soluções cada vez melhores, acabando numa ótima
+    def test_bnb_iter(self):
+        seqs = "ACTGACTAGTTATA ACTGCGATAGATTG AATGATCTAGTGCA CATGCTGCACTGCA".split()
+        solucoes = list(branch_and_bound_iter(seqs, 4, 14, 4))
+        scores = [s for _, s in solucoes]
+        self.assertEqual(scores, sorted(set(scores)))
+        self.assertEqual(solucoes[-1], ([0, 0, 0, 8], 15))
+        for offsets, s in solucoes:
+            self.assertEqual(score(seqs, offsets, 4), s)
+
+#A median string tem que dar os mesmos offsets e score que o branch and bound
+    def test_median_string(self):
+        casos = [("ACTGACTAGTTATA ACTGCGATAGATTG AATGATCTAGTGCA CATGCTGCACTGCA".split(), 4),
+                 ("ACTGACTAGTTATA ACTGCGATAGATTG AATGATCTAGTGCA CATGCTGCACTGCA".lower().split(), 4),
+                 ("ATGGTCGC TTGTCTGA CCGTAGTA".split(), 3)]
+        for seqs, tam_motif in casos:
+            with self.subTest(seqs=seqs):
+                self.assertEqual(median_string(seqs, len(seqs), len(seqs[0]), tam_motif),
+                                 branch_and_bound(seqs, len(seqs), len(seqs[0]), tam_motif))
+        random.seed(5)
+        for _ in range(30):
+            num_seqs = random.randint(1, 4)
+            tam_seqs = random.randint(1, 8)
+            tam_motif = random.randint(1, tam_seqs)
+            seqs = ["".join(random.choice("ACGTa") for _ in range(tam_seqs)) for _ in range(num_seqs)]
+            with self.subTest(seqs=seqs, tam_motif=tam_motif):
+                self.assertEqual(median_string(seqs, num_seqs, tam_seqs, tam_motif),
+                                 branch_and_bound(seqs, num_seqs, tam_seqs, tam_motif))
+        self.assertEqual(median_string(["A" * 12] * 4, 4, 12, 3, max_empates=2), ([[0, 0, 0, 0], [0, 0, 0, 1]], 12))
+        # Entrada degenerada: 18^10 alinhamentos ótimos, mas só os primeiros max_empates são gerados
+        self.assertEqual(median_string(["A" * 20] * 10, 10, 20, 3, max_empates=2),
+                         ([[0] * 10, [0] * 9 + [1]], 30))
+        seqs = ["ACT", "AGT"]  # AC e AG (e CT e GT) são motifs ótimos com os mesmos offsets
+        completo = median_string(seqs, 2, 3, 2)
+        self.assertEqual(completo, ([[0, 0], [1, 1]], 3))
+        self.assertEqual(completo, branch_and_bound(seqs, 2, 3, 2))
+        for max_empates in range(1, 4):
+            self.assertEqual(median_string(seqs, 2, 3, 2, max_empates=max_empates), (completo[0][:max_empates], 3))
+        with self.assertRaises(ValueError):
+            median_string("ACTG ACT_".split(), 2, 4, 2)
+
+#Muitas sequências com um motif curto: a pesquisa sobre os motifs continua rápida
+    def test_median_string_muitas_sequencias(self):
+        random.seed(8)
+        motif = "TGACGT"
+        posicoes = [random.randrange(35) for _ in range(25)]
+        seqs = []
+        for p in posicoes:
+            seq = [random.choice("ACGT") for _ in range(40)]
+            seq[p : p + len(motif)] = motif
+            seqs.append("".join(seq))
+        melhores, melhor = median_string(seqs, len(seqs), 40, len(motif))
+        self.assertEqual(melhor, 150)
+        self.assertIn(posicoes, melhores)
+
+
 #Testes para a função score
 
     def test_empty_offsets(self):